@@ -6,110 +6,51 @@ Predicts likelihood of 'penny drop' based on price endings.
 import streamlit as st
 import pandas as pd
 from scraper import HomeDepotScraper, bulk_update
+from scrape_service import ScrapeServiceClient, service_enabled
 from importer import find_clearance_items
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-import asyncio
+from storage import Storage, Version, HistoryIndex, get_storage
+from schema import WATCHLIST_COLUMNS, HISTORY_COLUMNS, empty_frame, format_cents, PREDICTION_COLUMNS
+from prediction import PREDICTION_VERSION, predict_drop, predict_drops, with_predictions
+from datetime import datetime
+from typing import Dict, Any, Optional, List
 import time
-import os
 import subprocess
 import sys
 
 
-def calculate_penny_drop_probability(price: float) -> Dict[str, Any]:
+def calculate_penny_drop_probability(price_cents: int) -> Dict[str, Any]:
     """
     Calculate the likelihood of a penny drop based on price ending.
     
-    Home Depot markdown cycle rules:
-    - Markdowns occur every 3 weeks (21 days)
-    - Items drop to $0.01 exactly 14 weeks after first clearance markdown
-    - .06 ending → Next drop in ~21 days
-    - .03 ending → High alert! Penny drop likely in 14-21 days
-    - .02 ending → Extreme alert! Hidden 90% markdown
-    
     Args:
-        price: Product price as float
+        price_cents: Product price in integer cents
         
     Returns:
         Dictionary with prediction details including timeline
     """
-    price_str = f"{price:.2f}"
-    cents = price_str[-2:]
-    today = datetime.now()
-    
-    # Markdown cycle logic based on price ending
-    if cents == "02":
-        # Extreme alert - hidden 90% markdown
-        probability = 0.95
-        confidence = "Extreme Alert"
-        alert_level = "extreme"
-        reasoning = "Price ends in .02 - This is a HIDDEN 90% markdown! Extreme alert!"
-        days_until_drop = 7  # Very soon
-        next_drop_date = today + timedelta(days=days_until_drop)
-        timeline = f"Penny drop expected within 7-14 days (by {next_drop_date.strftime('%B %d, %Y')})"
-        
-    elif cents == "03":
-        # High alert - penny drop likely soon
-        probability = 0.90
-        confidence = "High Alert"
-        alert_level = "high"
-        reasoning = "Price ends in .03 - High alert! Penny drop likely in 14-21 days"
-        days_until_drop = 14  # 2 weeks
-        next_drop_date = today + timedelta(days=days_until_drop)
-        timeline = f"Penny drop likely in 14-21 days (around {next_drop_date.strftime('%B %d, %Y')})"
-        
-    elif cents == "06":
-        # Next markdown in ~21 days (3 weeks)
-        probability = 0.75
-        confidence = "Moderate Alert"
-        alert_level = "moderate"
-        reasoning = "Price ends in .06 - Next markdown expected in ~21 days (3 weeks)"
-        days_until_drop = 21  # 3 weeks
-        next_drop_date = today + timedelta(days=days_until_drop)
-        timeline = f"Next markdown expected in ~21 days (around {next_drop_date.strftime('%B %d, %Y')})"
-        
-    elif cents == "00" or cents == "99":
-        # Regular pricing
-        probability = 0.10
-        confidence = "Low"
-        alert_level = "low"
-        reasoning = f"Price ends in .{cents} - Typical of regular pricing, not in clearance cycle"
-        days_until_drop = None
-        next_drop_date = None
-        timeline = "Not currently in clearance cycle"
-        
-    else:
-        # Unclear pattern
-        probability = 0.30
-        confidence = "Unclear"
-        alert_level = "low"
-        reasoning = f"Price ends in .{cents} - Unclear pattern, may or may not be in clearance cycle"
-        days_until_drop = None
-        next_drop_date = None
-        timeline = "Pattern unclear - monitor for changes"
-    
-    return {
-        'probability': probability,
-        'confidence': confidence,
-        'alert_level': alert_level,
-        'reasoning': reasoning,
-        'price_ending': cents,
-        'full_price': price,
-        'days_until_drop': days_until_drop,
-        'next_drop_date': next_drop_date,
-        'timeline': timeline
-    }
+    return predict_drop(price_cents)
 
 
-def format_price(price: float) -> str:
-    """Format price for display."""
-    return f"${price:,.2f}"
+def format_price(price_cents: int) -> str:
+    """Format price in cents for display."""
+    return format_cents(price_cents)
+
+
+@st.cache_resource
+def get_warm_scraper() -> HomeDepotScraper:
+    """
+    Process-wide scraper shared by every session for lookups and syncs. Its synchronous
+    API runs on the scraper module's background event loop and keeps one browser warm,
+    so a lookup costs a page load instead of a browser launch.
+    """
+    return HomeDepotScraper(block_resources=True)
 
 
 def fetch_price_safely(sku: str) -> Optional[Dict[str, Any]]:
     """
     Safely fetch price using async scraper in Streamlit context.
-    Handles event loop issues that can occur with asyncio.run() in Streamlit.
+    Lookups run on the shared warm scraper's own event loop thread, so there are
+    no event loop conflicts with Streamlit.
     
     Args:
         sku: Product SKU number
@@ -118,17 +59,7 @@ def fetch_price_safely(sku: str) -> Optional[Dict[str, Any]]:
         Dictionary with price and product info, or None if failed
     """
     try:
-        # Check if there's already an event loop running
-        try:
-            loop = asyncio.get_running_loop()
-            # If we're in an async context, run in a separate thread
-            import concurrent.futures
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                future = executor.submit(_run_scraper_sync, sku)
-                return future.result(timeout=60)
-        except RuntimeError:
-            # No event loop running, safe to use asyncio.run()
-            return _run_scraper_sync(sku)
+        return _run_scraper_sync(sku)
     except Exception as e:
         st.error(f"Error fetching price: {e}")
         return None
@@ -136,8 +67,7 @@ def fetch_price_safely(sku: str) -> Optional[Dict[str, Any]]:
 
 def _run_scraper_sync(sku: str) -> Optional[Dict[str, Any]]:
     """
-    Run the scraper synchronously using asyncio.run().
-    This is a helper function that can be called from a thread if needed.
+    Run a lookup synchronously on the scrape service or the shared warm scraper.
     
     Args:
         sku: Product SKU number
@@ -145,70 +75,162 @@ def _run_scraper_sync(sku: str) -> Optional[Dict[str, Any]]:
     Returns:
         Dictionary with price and product info, or None if failed
     """
-    scraper = HomeDepotScraper()
-    return scraper.get_price_by_sku(sku)
+    # Prefer the shared scrape service (warm browser, no Chromium in this process)
+    if service_enabled():
+        try:
+            return ScrapeServiceClient().get_price_by_sku(sku)
+        except ConnectionError as e:
+            print(f"⚠️  Scrape service unavailable, scraping in-process: {e}")
+    
+    return get_warm_scraper().get_price_by_sku(sku)
+
+
+def run_bulk_update() -> Dict[str, Any]:
+    """
+    Refresh prices for every tracked SKU, through the scrape service when enabled.
+    
+    Returns:
+        Dictionary with update statistics
+    """
+    try:
+        if service_enabled():
+            try:
+                return ScrapeServiceClient().bulk_update(concurrency=4)
+            except ConnectionError as e:
+                print(f"⚠️  Scrape service unavailable, syncing in-process: {e}")
+        
+        return bulk_update(concurrency=4, scraper=get_warm_scraper())
+    finally:
+        clear_data_caches()
+
+
+@st.cache_resource
+def get_app_storage() -> Storage:
+    """Storage backend shared by every session (opened once per process)."""
+    return get_storage()
+
+
+# Loads are cached across sessions, keyed on the backend's data version (file mtime and
+# size), so reruns only hit the disk after something was written. Writes made here
+# also clear the caches straight away.
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_watchlist(location: str, version: Version) -> pd.DataFrame:
+    """Watchlist at `location` as of `version`."""
+    return get_app_storage().load_watchlist()
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_history(location: str, version: Version, sku: Optional[str]) -> pd.DataFrame:
+    """Price history (one SKU's, or all of it) as of `version`."""
+    return get_app_storage().load_history(sku)
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _cached_history_skus(location: str, version: Version) -> List[str]:
+    """SKUs with price history as of `version`."""
+    return get_app_storage().history_skus()
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cached_history_index(location: str, version: Version) -> HistoryIndex:
+    """Per-SKU index over the price history as of `version` (one shared copy, not pickled per call)."""
+    return HistoryIndex(get_app_storage().load_history())
+
+
+def clear_data_caches():
+    """Drop cached watchlist and history loads (after the app writes to storage)."""
+    _cached_watchlist.clear()
+    _cached_history.clear()
+    _cached_history_skus.clear()
+    _cached_history_index.clear()
 
 
 def load_tracked_skus() -> pd.DataFrame:
-    """Load tracked SKUs from CSV file."""
+    """Load tracked SKUs from storage."""
     try:
-        if os.path.exists("tracked_skus.csv"):
-            df = pd.read_csv("tracked_skus.csv")
-            # Ensure required columns exist
-            required_cols = ['sku', 'store_id', 'name', 'last_price', 'last_updated']
-            for col in required_cols:
-                if col not in df.columns:
-                    df[col] = ''
-            return df
-        else:
-            return pd.DataFrame(columns=['sku', 'store_id', 'name', 'last_price', 'last_updated'])
+        storage = get_app_storage()
+        return _cached_watchlist(storage.location, storage.watchlist_version())
     except Exception as e:
         st.error(f"Error loading tracked SKUs: {e}")
-        return pd.DataFrame(columns=['sku', 'store_id', 'name', 'last_price', 'last_updated'])
+        return empty_frame(WATCHLIST_COLUMNS)
 
 
 def save_tracked_skus(df: pd.DataFrame):
-    """Save tracked SKUs to CSV file."""
+    """Save tracked SKUs to storage."""
     try:
-        df.to_csv("tracked_skus.csv", index=False)
+        get_app_storage().save_watchlist(df)
     except Exception as e:
         st.error(f"Error saving tracked SKUs: {e}")
+    clear_data_caches()
 
 
 def add_sku_to_tracking(sku: str, name: str = "", store_id: str = ""):
     """Add a new SKU to the tracking list."""
-    df = load_tracked_skus()
-    
-    # Check if SKU already exists
-    if not df.empty and sku in df['sku'].values:
+    added = get_app_storage().add_skus([{
+        'sku': sku,
+        'store_id': store_id,
+        'name': name,
+        'last_price_cents': None,
+        'last_updated': ''
+    }])
+    clear_data_caches()
+    
+    # Nothing added means the SKU already exists
+    if not added:
         st.warning(f"SKU {sku} is already being tracked!")
-        return
-    
-    # Add new row
-    new_row = pd.DataFrame({
-        'sku': [sku],
-        'store_id': [store_id],
-        'name': [name],
-        'last_price': [''],
-        'last_updated': ['']
-    })
+
+
+def remove_skus_from_tracking(skus: List[str]):
+    """Stop tracking the given SKUs."""
+    try:
+        get_app_storage().remove_skus(skus)
+    except Exception as e:
+        st.error(f"Error removing SKUs: {e}")
+    clear_data_caches()
+
+
+def record_tracked_price(sku: str, price_cents: int, store_id: Optional[str] = None):
+    """Store a looked-up price for a tracked SKU, with its prediction and a history row."""
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        storage = get_app_storage()
+        storage.update_prices(with_predictions({sku: {'last_price_cents': price_cents, 'last_updated': current_time}}))
+        storage.append_history([{'sku': sku, 'price_cents': price_cents, 'timestamp': current_time, 'store_id': store_id}])
+    except Exception as e:
+        st.error(f"Error saving price for SKU {sku}: {e}")
+    clear_data_caches()
+
+
+def load_price_history(sku: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load price history from storage, optionally for one SKU only (sorted by time).
     
-    df = pd.concat([df, new_row], ignore_index=True)
-    save_tracked_skus(df)
+    Backends that can read one SKU's rows (SQLite, Parquet) are queried for just those;
+    CSV history is indexed in memory once per version and the SKU's rows sliced out.
+    """
+    try:
+        storage = get_app_storage()
+        version = storage.history_version()
+        if storage.reads_history_by_sku or sku is None:
+            return _cached_history(storage.location, version, sku)
+        return _cached_history_index(storage.location, version).rows(sku)
+    except Exception as e:
+        st.error(f"Error loading price history: {e}")
+        return empty_frame(HISTORY_COLUMNS)
 
 
-def load_price_history() -> pd.DataFrame:
-    """Load price history from CSV file."""
+def load_history_skus() -> List[str]:
+    """SKUs that have price history."""
     try:
-        if os.path.exists("price_history.csv"):
-            df = pd.read_csv("price_history.csv")
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            return df
-        else:
-            return pd.DataFrame(columns=['sku', 'price', 'timestamp'])
+        storage = get_app_storage()
+        version = storage.history_version()
+        if storage.reads_history_by_sku:
+            return _cached_history_skus(storage.location, version)
+        return _cached_history_index(storage.location, version).skus
     except Exception as e:
         st.error(f"Error loading price history: {e}")
-        return pd.DataFrame(columns=['sku', 'price', 'timestamp'])
+        return []
 
 
 def ensure_playwright_browsers():
@@ -345,6 +367,7 @@ with st.sidebar:
     if st.button("🔍 Scan for Clearance Items", type="primary", use_container_width=True):
         with st.spinner("🔍 Scanning clearance sections... This may take 1-2 minutes."):
             result = find_clearance_items()
+            clear_data_caches()
             
             if result['success']:
                 st.success(f"✅ {result['message']}")
@@ -393,7 +416,7 @@ with tab1:
     with col_refresh:
         if st.button("🔄 Sync Prices", type="primary", use_container_width=True):
             with st.spinner("🔄 Updating all prices... This may take a while."):
-                result = bulk_update()
+                result = run_bulk_update()
                 if result['success']:
                     st.success(f"✅ {result['message']}")
                     st.rerun()
@@ -406,49 +429,25 @@ with tab1:
     
     # Display tracked items table
     if not df.empty:
-        # Add prediction columns
+        # Predictions are stored when prices are refreshed; only rows without a current one
+        # (never synced, or predicted by older rules) are predicted here
         display_df = df.copy()
-        
-        # Calculate predictions for each item
-        predictions = []
-        for idx, row in df.iterrows():
-            if pd.notna(row['last_price']) and row['last_price'] != '':
-                try:
-                    price = float(row['last_price'])
-                    pred = calculate_penny_drop_probability(price)
-                    predictions.append({
-                        'alert_level': pred['alert_level'],
-                        'probability': pred['probability'],
-                        'days_until_drop': pred.get('days_until_drop', 'N/A')
-                    })
-                except (ValueError, TypeError):
-                    predictions.append({
-                        'alert_level': 'unknown',
-                        'probability': 0,
-                        'days_until_drop': 'N/A'
-                    })
-            else:
-                predictions.append({
-                    'alert_level': 'unknown',
-                    'probability': 0,
-                    'days_until_drop': 'N/A'
-                })
-        
-        pred_df = pd.DataFrame(predictions)
-        display_df = pd.concat([display_df, pred_df], axis=1)
+        stale = display_df['prediction_version'].ne(PREDICTION_VERSION).fillna(True).astype(bool)
+        if stale.any():
+            display_df.loc[stale, PREDICTION_COLUMNS] = predict_drops(display_df.loc[stale, 'last_price_cents'])
         
         # Format display
-        display_df['last_price'] = display_df['last_price'].apply(
-            lambda x: f"${float(x):,.2f}" if pd.notna(x) and x != '' else "Not fetched"
+        display_df['last_price_cents'] = display_df['last_price_cents'].apply(
+            lambda x: format_price(x) if pd.notna(x) else "Not fetched"
         )
         
         # Display table
         st.dataframe(
-            display_df[['sku', 'name', 'last_price', 'last_updated', 'alert_level', 'probability', 'days_until_drop']],
+            display_df[['sku', 'name', 'last_price_cents', 'last_updated', 'alert_level', 'probability', 'days_until_drop']],
             column_config={
                 "sku": "SKU",
                 "name": "Product Name",
-                "last_price": st.column_config.TextColumn("Price", width="medium"),
+                "last_price_cents": st.column_config.TextColumn("Price", width="medium"),
                 "last_updated": "Last Updated",
                 "alert_level": "Alert Level",
                 "probability": st.column_config.NumberColumn("Penny Drop Probability", format="%.0f%%", width="medium"),
@@ -468,8 +467,7 @@ with tab1:
         )
         if st.button("🗑️ Remove Selected", type="secondary"):
             if skus_to_delete:
-                df = df[~df['sku'].isin(skus_to_delete)]
-                save_tracked_skus(df)
+                remove_skus_from_tracking(skus_to_delete)
                 st.success(f"✅ Removed {len(skus_to_delete)} SKU(s)")
                 st.rerun()
     else:
@@ -503,7 +501,7 @@ with tab2:
     # Initialize session state for history
     if 'price_history' not in st.session_state:
         st.session_state.price_history = []
-
+    
     # Process prediction
     if predict_button:
         if not sku_input or not sku_input.strip():
@@ -515,8 +513,13 @@ with tab2:
                 result = fetch_price_safely(sku)
             
             if result:
-                price = result['price']
-                prediction = calculate_penny_drop_probability(price)
+                price_cents = result['price_cents']
+                prediction = calculate_penny_drop_probability(price_cents)
+                
+                # A tracked SKU's lookup refreshes its stored price and prediction
+                tracked = df[df['sku'].astype(str) == sku]
+                if not tracked.empty:
+                    record_tracked_price(sku, price_cents, tracked['store_id'].iloc[0])
                 
                 # Display results
                 st.success("✅ Price fetched successfully!")
@@ -526,7 +529,7 @@ with tab2:
                 col_price, col_method = st.columns([2, 1])
                 
                 with col_price:
-                    st.metric("Current Price", format_price(price))
+                    st.metric("Current Price", format_price(price_cents))
                 
                 with col_method:
                     st.caption(f"Method: {result['method']}")
@@ -627,7 +630,7 @@ with tab2:
                 history_entry = {
                     'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                     'sku': sku,
-                    'price': price,
+                    'price_cents': price_cents,
                     'probability': probability,
                     'confidence': confidence,
                     'days_until_drop': prediction.get('days_until_drop', 'N/A'),
@@ -654,12 +657,11 @@ with tab2:
 with tab3:
     st.subheader("📊 Price History & Trends")
     
-    # Load price history
-    history_df = load_price_history()
+    # SKUs with price history; rows are only loaded for the selected SKU
+    available_skus = load_history_skus()
     
-    if not history_df.empty:
+    if available_skus:
         # SKU selector
-        available_skus = history_df['sku'].unique().tolist()
         selected_sku = st.selectbox(
             "Select SKU to view price history:",
             options=available_skus,
@@ -667,19 +669,18 @@ with tab3:
         )
         
         if selected_sku:
-            # Filter history for selected SKU
-            sku_history = history_df[history_df['sku'] == selected_sku].copy()
-            sku_history = sku_history.sort_values('timestamp')
+            # History for the selected SKU only (already sorted by time)
+            sku_history = load_price_history(selected_sku)
             
             if not sku_history.empty:
-                # Display chart
-                chart_data = sku_history[['timestamp', 'price']].set_index('timestamp')
+                # Chart in dollars
+                chart_data = pd.DataFrame({'price': sku_history['price_cents'] / 100}).set_index(sku_history['timestamp'])
                 st.line_chart(chart_data, use_container_width=True)
                 
                 # Display table
                 st.markdown("### 📋 Price History Table")
                 display_history = sku_history.copy()
-                display_history['price'] = display_history['price'].apply(lambda x: f"${x:,.2f}")
+                display_history['price_cents'] = display_history['price_cents'].apply(format_price)
                 display_history['timestamp'] = display_history['timestamp'].dt.strftime("%Y-%m-%d %H:%M:%S")
                 display_history.columns = ['SKU', 'Price', 'Timestamp']
                 
@@ -692,11 +693,11 @@ with tab3:
                 # Statistics
                 col_stat1, col_stat2, col_stat3 = st.columns(3)
                 with col_stat1:
-                    st.metric("Current Price", f"${sku_history['price'].iloc[-1]:,.2f}")
+                    st.metric("Current Price", format_price(sku_history['price_cents'].iloc[-1]))
                 with col_stat2:
-                    price_change = sku_history['price'].iloc[-1] - sku_history['price'].iloc[0]
-                    st.metric("Total Change", f"${price_change:,.2f}", 
-                             delta=f"{((price_change / sku_history['price'].iloc[0]) * 100):.1f}%")
+                    price_change = sku_history['price_cents'].iloc[-1] - sku_history['price_cents'].iloc[0]
+                    st.metric("Total Change", format_price(price_change), 
+                             delta=f"{((price_change / sku_history['price_cents'].iloc[0]) * 100):.1f}%")
                 with col_stat3:
                     st.metric("Data Points", len(sku_history))
             else:
@@ -5,12 +5,13 @@ Uses the NCNI-5 hack to find clearance items from Home Depot categories.
 
 import asyncio
 import time
-import pandas as pd
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 
+from storage import Storage, get_storage
+
 
 class ClearanceImporter:
     """Importer for finding clearance items using the NCNI-5 hack."""
@@ -347,53 +348,42 @@ class ClearanceImporter:
         
         return all_skus
     
-    def save_to_csv(self, skus: List[Dict[str, Any]], csv_path: str = "tracked_skus.csv") -> Dict[str, Any]:
+    def save_to_csv(self, skus: List[Dict[str, Any]], csv_path: str = "tracked_skus.csv",
+                    storage: Optional[Storage] = None) -> Dict[str, Any]:
         """
-        Save discovered SKUs to CSV file, merging with existing data.
+        Save discovered SKUs to the watchlist, merging with existing data.
         
         Args:
             skus: List of SKU dictionaries
-            csv_path: Path to CSV file
+            csv_path: Path to CSV file (CSV storage backend)
+            storage: Storage backend to use; defaults to get_storage()
             
         Returns:
             Dictionary with save statistics
         """
         try:
-            # Load existing tracked SKUs if file exists
-            try:
-                existing_df = pd.read_csv(csv_path)
-                existing_skus = set(existing_df['sku'].astype(str))
-            except FileNotFoundError:
-                existing_df = pd.DataFrame(columns=['sku', 'store_id', 'name', 'last_price', 'last_updated'])
-                existing_skus = set()
+            if storage is None:
+                storage = get_storage(watchlist_path=csv_path)
             
-            # Create new rows for SKUs not already tracked
-            new_rows = []
-            for sku_info in skus:
-                sku = str(sku_info['sku'])
-                if sku not in existing_skus:
-                    new_rows.append({
-                        'sku': sku,
-                        'store_id': sku_info.get('store_id', self.store_id),
-                        'name': sku_info.get('name', ''),
-                        'last_price': '',
-                        'last_updated': ''
-                    })
+            # Add SKUs not already tracked; storage skips the rest
+            new_rows = storage.add_skus([
+                {
+                    'sku': str(sku_info['sku']),
+                    'store_id': sku_info.get('store_id', self.store_id),
+                    'name': sku_info.get('name', ''),
+                    'last_price_cents': None,
+                    'last_updated': ''
+                }
+                for sku_info in skus
+            ])
+            total_skus = len(storage.load_watchlist())
             
             if new_rows:
-                new_df = pd.DataFrame(new_rows)
-                # Combine with existing data
-                combined_df = pd.concat([existing_df, new_df], ignore_index=True)
-                # Remove duplicates (keep first occurrence)
-                combined_df = combined_df.drop_duplicates(subset=['sku'], keep='first')
-                # Save to CSV
-                combined_df.to_csv(csv_path, index=False)
-                
                 return {
                     'success': True,
-                    'message': f'Added {len(new_rows)} new SKUs to {csv_path}',
+                    'message': f'Added {len(new_rows)} new SKUs to {storage.location}',
                     'new_skus': len(new_rows),
-                    'total_skus': len(combined_df),
+                    'total_skus': total_skus,
                     'skus': new_rows
                 }
             else:
@@ -401,7 +391,7 @@ class ClearanceImporter:
                     'success': True,
                     'message': 'No new SKUs to add (all already tracked)',
                     'new_skus': 0,
-                    'total_skus': len(existing_df),
+                    'total_skus': total_skus,
                     'skus': []
                 }
                 
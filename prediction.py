@@ -0,0 +1,167 @@
+"""
+Penny Drop Prediction
+Home Depot markdown cycle rules keyed by price ending, applied to one price or a whole column.
+
+Home Depot markdown cycle rules:
+- Markdowns occur every 3 weeks (21 days)
+- Items drop to $0.01 exactly 14 weeks after first clearance markdown
+- .06 ending → Next drop in ~21 days
+- .03 ending → High alert! Penny drop likely in 14-21 days
+- .02 ending → Extreme alert! Hidden 90% markdown
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Iterable, Union
+
+from schema import PREDICTION_COLUMNS, TIMESTAMP_DTYPE
+
+
+# Rule for each price ending (cents % 100); endings not listed use UNCLEAR_RULE
+ENDING_RULES = {
+    2: {
+        'probability': 0.95,
+        'confidence': "Extreme Alert",
+        'alert_level': "extreme",
+        'days_until_drop': 7,  # Very soon
+        'reasoning': "Price ends in .{ending} - This is a HIDDEN 90% markdown! Extreme alert!",
+        'timeline': "Penny drop expected within 7-14 days (by {date})"
+    },
+    3: {
+        'probability': 0.90,
+        'confidence': "High Alert",
+        'alert_level': "high",
+        'days_until_drop': 14,  # 2 weeks
+        'reasoning': "Price ends in .{ending} - High alert! Penny drop likely in 14-21 days",
+        'timeline': "Penny drop likely in 14-21 days (around {date})"
+    },
+    6: {
+        'probability': 0.75,
+        'confidence': "Moderate Alert",
+        'alert_level': "moderate",
+        'days_until_drop': 21,  # 3 weeks
+        'reasoning': "Price ends in .{ending} - Next markdown expected in ~21 days (3 weeks)",
+        'timeline': "Next markdown expected in ~21 days (around {date})"
+    },
+}
+
+REGULAR_RULE = {
+    'probability': 0.10,
+    'confidence': "Low",
+    'alert_level': "low",
+    'days_until_drop': None,
+    'reasoning': "Price ends in .{ending} - Typical of regular pricing, not in clearance cycle",
+    'timeline': "Not currently in clearance cycle"
+}
+ENDING_RULES[0] = ENDING_RULES[99] = REGULAR_RULE
+
+UNCLEAR_RULE = {
+    'probability': 0.30,
+    'confidence': "Unclear",
+    'alert_level': "low",
+    'days_until_drop': None,
+    'reasoning': "Price ends in .{ending} - Unclear pattern, may or may not be in clearance cycle",
+    'timeline': "Pattern unclear - monitor for changes"
+}
+
+# Columns for items without a price
+UNKNOWN_ALERT_LEVEL = 'unknown'
+UNKNOWN_PROBABILITY = 0.0
+
+# Stored with materialized predictions; bump it when the rules change so stale ones are recomputed
+PREDICTION_VERSION = 1
+
+
+def _rule(ending: int) -> Dict[str, Any]:
+    """Rule for a price ending."""
+    return ENDING_RULES.get(ending, UNCLEAR_RULE)
+
+
+# Lookup tables indexed by price ending, so a whole column is predicted with one take()
+_ALERT_LEVELS = np.array([_rule(e)['alert_level'] for e in range(100)] + [UNKNOWN_ALERT_LEVEL], dtype=object)
+_PROBABILITIES = np.array([_rule(e)['probability'] for e in range(100)] + [UNKNOWN_PROBABILITY])
+_DAYS = np.array([_rule(e)['days_until_drop'] or -1 for e in range(100)] + [-1])
+
+
+def predict_drops(prices_cents: Union[pd.Series, Iterable[Optional[int]]],
+                  today: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Predict penny drops for a column of prices in one vectorized pass.
+    
+    Args:
+        prices_cents: Prices in integer cents; missing prices get alert level 'unknown'
+        today: Date the predictions count from (default: now)
+    
+    Returns:
+        Frame aligned with prices_cents (same index for a Series) with the
+        PREDICTION_COLUMNS (days_until_drop is nullable Int32)
+    """
+    index = prices_cents.index if isinstance(prices_cents, pd.Series) else None
+    cents = pd.to_numeric(pd.Series(prices_cents, index=index, dtype=object), errors='coerce')
+    missing = cents.isna().to_numpy()
+    # Row 100 of each lookup table holds the value for a missing price
+    endings = np.where(missing, 100, np.nan_to_num(cents.to_numpy(dtype='float64')) % 100).astype(np.intp)
+    
+    days = pd.Series(_DAYS.take(endings), index=cents.index)
+    has_drop = days >= 0
+    today = pd.Timestamp(today or datetime.now()).floor('s')
+    
+    return pd.DataFrame({
+        'alert_level': _ALERT_LEVELS.take(endings),
+        'probability': _PROBABILITIES.take(endings),
+        'days_until_drop': days.where(has_drop).astype('Int32'),
+        'next_drop_date': (today + pd.to_timedelta(days.where(has_drop), unit='D')).astype(TIMESTAMP_DTYPE),
+        'prediction_version': pd.array([PREDICTION_VERSION] * len(days), dtype='Int32')
+    }, index=cents.index)[PREDICTION_COLUMNS]
+
+
+def with_predictions(updates: Dict[str, Dict[str, Any]], today: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Add the prediction columns to watchlist price updates, so they are stored with the price.
+    
+    Args:
+        updates: {sku: {'last_price_cents', ...}} as passed to Storage.update_prices
+        today: Date the predictions count from (default: now)
+    
+    Returns:
+        updates, with each SKU's PREDICTION_COLUMNS filled in
+    """
+    if not updates:
+        return updates
+    skus = list(updates)
+    prices = pd.Series([updates[sku].get('last_price_cents') for sku in skus], index=skus, dtype=object)
+    for sku, prediction in zip(skus, predict_drops(prices, today).to_dict('records')):
+        updates[sku].update(prediction)
+    return updates
+
+
+def predict_drop(price_cents: int, today: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Predict a penny drop for one price, with the explanation shown on the lookup tab.
+    
+    Args:
+        price_cents: Product price in integer cents
+        today: Date the prediction counts from (default: now)
+    
+    Returns:
+        Dictionary with prediction details including timeline
+    """
+    ending = int(price_cents) % 100
+    rule = _rule(ending)
+    days_until_drop = rule['days_until_drop']
+    next_drop_date = (today or datetime.now()) + timedelta(days=days_until_drop) if days_until_drop else None
+    
+    return {
+        'probability': rule['probability'],
+        'confidence': rule['confidence'],
+        'alert_level': rule['alert_level'],
+        'reasoning': rule['reasoning'].format(ending=f"{ending:02d}"),
+        'price_ending': f"{ending:02d}",
+        'price_cents': price_cents,
+        'days_until_drop': days_until_drop,
+        'next_drop_date': next_drop_date,
+        'timeline': rule['timeline'].format(
+            date=next_drop_date.strftime('%B %d, %Y') if next_drop_date else ''
+        )
+    }
@@ -0,0 +1,222 @@
+"""
+Penny App Schema
+Column types for the watchlist and price history, and typed readers for their CSV files.
+
+Every loader goes through these readers so frames come back with the same dtypes
+whatever the backend: SKUs and store IDs as categorical strings (leading zeros kept),
+prices as integer cents (nullable Int32) and timestamps as datetime64 parsed with one
+fixed format. Files written before prices moved to cents ('last_price'/'price' in
+dollars) are converted on load.
+"""
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Optional, List, Dict, Iterator, Any, Union, IO
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow only speeds up CSV parsing
+    pa = pa_csv = None
+
+
+# Penny-drop prediction for each SKU's last price, materialized when its price is refreshed
+PREDICTION_COLUMNS = ['alert_level', 'probability', 'days_until_drop', 'next_drop_date', 'prediction_version']
+
+WATCHLIST_COLUMNS = ['sku', 'store_id', 'name', 'last_price_cents', 'last_updated'] + PREDICTION_COLUMNS
+HISTORY_COLUMNS = ['sku', 'price_cents', 'timestamp']
+
+# Dollar columns from older files -> the cents columns that replaced them
+LEGACY_PRICE_COLUMNS = {'last_price': 'last_price_cents', 'price': 'price_cents'}
+
+# Format of every timestamp the app writes
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Logical type of each column in either file
+COLUMN_TYPES = {
+    'sku': 'category',
+    'store_id': 'category',
+    'name': 'text',
+    'last_price_cents': 'cents',
+    'price_cents': 'cents',
+    'last_price': 'dollars',
+    'price': 'dollars',
+    'last_updated': 'timestamp',
+    'timestamp': 'timestamp',
+    'alert_level': 'text',
+    'probability': 'float',
+    'days_until_drop': 'integer',
+    'next_drop_date': 'timestamp',
+    'prediction_version': 'integer',
+}
+
+CENTS_DTYPE = 'Int32'
+INTEGER_DTYPE = 'Int32'
+# Timestamps are written to the second, so every timestamp column uses one resolution
+TIMESTAMP_DTYPE = 'datetime64[s]'
+
+
+def to_cents(value: Any) -> Optional[int]:
+    """
+    Convert a price to integer cents without going through binary floating point.
+    
+    Args:
+        value: Number or price text such as "$1,234.56"
+    
+    Returns:
+        Cents, or None if value isn't a price
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        amount = Decimal(str(value).replace(',', '').replace('$', '').strip())
+    except InvalidOperation:
+        return None
+    if not amount.is_finite():
+        return None
+    return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def dollars_to_cents(values: pd.Series) -> pd.Series:
+    """Convert a column of dollar prices (numbers or numeric text) to nullable integer cents."""
+    dollars = pd.to_numeric(values.replace('', None), errors='coerce').astype('float64')
+    return (dollars * 100).round().astype(CENTS_DTYPE)
+
+
+def cents_to_text(cents: Optional[int]) -> str:
+    """Plain decimal dollars for cents (1234 -> '12.34'), or '' for a missing price."""
+    if cents is None or pd.isna(cents):
+        return ''
+    cents = int(cents)
+    sign = '-' if cents < 0 else ''
+    return f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+def format_cents(cents: int) -> str:
+    """Format cents for display (123456 -> '$1,234.56')."""
+    cents = int(cents)
+    sign = '-' if cents < 0 else ''
+    return f"{sign}${abs(cents) // 100:,}.{abs(cents) % 100:02d}"
+
+
+def empty_frame(columns: List[str]) -> pd.DataFrame:
+    """Empty frame with the schema's dtypes."""
+    return apply_schema(pd.DataFrame({col: pd.Series(dtype=object) for col in columns}))
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Coerce known columns to their schema dtypes (frames from SQL, Parquet or old CSVs).
+    
+    Legacy dollar columns are converted to cents and dropped; where both are present
+    (a file migrated part way), the cents column wins.
+    
+    Args:
+        df: Frame with any subset of the schema's columns; other columns are left alone
+    
+    Returns:
+        The converted frame
+    """
+    for legacy, cents_col in LEGACY_PRICE_COLUMNS.items():
+        if legacy not in df.columns:
+            continue
+        converted = dollars_to_cents(df[legacy])
+        if cents_col in df.columns:
+            converted = pd.to_numeric(df[cents_col], errors='coerce').round().astype(CENTS_DTYPE).fillna(converted)
+            df = df.drop(columns=[cents_col])
+        # The cents column takes the dollar column's place
+        position = df.columns.get_loc(legacy)
+        df = df.drop(columns=[legacy])
+        df.insert(position, cents_col, converted)
+    
+    for col, kind in COLUMN_TYPES.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if kind == 'category':
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                # Strings, not numbers, so SKUs and store IDs keep their leading zeros
+                values = values.where(values.isna(), values.astype(str).str.strip())
+                df[col] = values.astype('category')
+        elif kind == 'text':
+            df[col] = values.astype(object).where(values.notna(), None)
+        elif kind in ('cents', 'integer'):
+            dtype = CENTS_DTYPE if kind == 'cents' else INTEGER_DTYPE
+            if values.dtype != dtype:
+                df[col] = pd.to_numeric(values.replace('', None), errors='coerce').round().astype(dtype)
+        elif kind == 'float':
+            if values.dtype != 'float64':
+                df[col] = pd.to_numeric(values.replace('', None), errors='coerce').astype('float64')
+        elif kind == 'timestamp':
+            if values.dtype != TIMESTAMP_DTYPE:
+                if not pd.api.types.is_datetime64_any_dtype(values):
+                    values = parse_timestamps(values)
+                df[col] = values.dt.floor('s').astype(TIMESTAMP_DTYPE)
+    return df
+
+
+def parse_timestamps(values: pd.Series) -> pd.Series:
+    """Parse timestamps with the fixed TIMESTAMP_FORMAT (no per-row format inference)."""
+    return pd.to_datetime(values.replace('', None), format=TIMESTAMP_FORMAT, errors='coerce')
+
+
+def _csv_dtypes(columns: Optional[List[str]] = None) -> Dict[str, object]:
+    """dtype argument for pandas.read_csv: everything but prices is read as text."""
+    return {
+        col: ('float64' if kind in ('cents', 'dollars', 'integer', 'float') else str)
+        for col, kind in COLUMN_TYPES.items()
+        if columns is None or col in columns
+    }
+
+
+def read_csv(path: Union[str, IO[bytes]], usecols: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read a watchlist or history CSV with the schema's dtypes.
+    
+    Uses pyarrow's multithreaded parser when it is installed, with column types given
+    up front so no column is type-inferred; otherwise the pandas C parser.
+    
+    Args:
+        path: CSV file, or a seekable binary stream of CSV data
+        usecols: Only read these columns
+    
+    Returns:
+        Typed dataframe
+    """
+    if pa_csv is not None:
+        arrow_types = {
+            'category': pa.string(), 'text': pa.string(), 'cents': pa.int64(), 'dollars': pa.float64(),
+            'integer': pa.int64(), 'float': pa.float64(), 'timestamp': pa.string()
+        }
+        try:
+            table = pa_csv.read_csv(
+                path,
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col: arrow_types[kind] for col, kind in COLUMN_TYPES.items()},
+                    include_columns=usecols,
+                    strings_can_be_null=True
+                )
+            )
+            return apply_schema(table.to_pandas())
+        except pa.ArrowInvalid:
+            # Malformed rows - fall back to the more forgiving pandas parser
+            if not isinstance(path, str):
+                path.seek(0)
+    return apply_schema(pd.read_csv(path, usecols=usecols, dtype=_csv_dtypes()))
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate typed frames with the same columns, keeping categorical columns categorical."""
+    combined = pd.concat(frames, ignore_index=True)
+    for col in combined.columns:
+        if all(isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames):
+            # Plain concat turns categoricals with different categories into object columns
+            combined[col] = union_categoricals([frame[col] for frame in frames])
+    return combined
+
+
+def read_csv_chunks(path: str, chunksize: int) -> Iterator[pd.DataFrame]:
+    """Read a large CSV in typed chunks of `chunksize` rows."""
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=_csv_dtypes()):
+        yield apply_schema(chunk)
@@ -0,0 +1,270 @@
+"""
+Home Depot Scrape Service
+Long-lived local worker process that owns a warm browser pool and serves price lookups
+and bulk syncs to any number of Streamlit sessions and CLI invocations.
+
+Clients talk to it over a local TCP port using one JSON object per line:
+    {"op": "get_price", "sku": "100123456"}  ->  {"ok": true, "result": {...}}
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from typing import Optional, Dict, Any
+
+from scraper import HomeDepotScraper, _bulk_update_async
+from storage import Storage, get_storage
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("PENNY_SCRAPER_PORT", "8765"))
+
+
+class ScrapeService:
+    """Serves scraper requests from one shared, warm HomeDepotScraper.
+    
+    Bulk syncs always refresh the service's own storage; clients can't point it at
+    other files.
+    """
+    
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, concurrency: int = 4,
+                 storage: Optional[Storage] = None):
+        """
+        Initialize service.
+        
+        Args:
+            host: Interface to listen on (keep this local - there is no authentication)
+            port: Port to listen on
+            concurrency: Maximum number of SKUs fetched at once across all clients
+            storage: Storage that bulk syncs refresh (default: get_storage(), relative
+                to the service's working directory)
+        """
+        self.host = host
+        self.port = port
+        self.concurrency = concurrency
+        self.scraper = HomeDepotScraper(block_resources=True)
+        self.storage = storage or get_storage()
+        self.requests_served = 0
+        self.started_at = time.time()
+        self._bulk_lock = None
+        self._server = None
+    
+    async def _handle_get_price(self, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Look up one SKU on the shared browser pool."""
+        return await self.scraper._fetch_pooled_async(str(request['sku']).strip())
+    
+    async def _handle_bulk_update(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a bulk sync of the service's storage on the shared browser pool (one sync at a time)."""
+        async with self._bulk_lock:
+            return await _bulk_update_async(
+                concurrency=min(int(request.get('concurrency', self.concurrency)), self.concurrency),
+                scraper=self.scraper,
+                storage=self.storage
+            )
+    
+    def _stats(self) -> Dict[str, Any]:
+        """Service and browser pool counters."""
+        return {
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'requests_served': self.requests_served,
+            'concurrency': self.concurrency,
+            'browser_running': self.scraper.browser is not None,
+            'idle_pages': len(self.scraper._idle_pages),
+            'fetch_stats': self.scraper.fetch_stats,
+            'route_stats': self.scraper.route_stats
+        }
+    
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Run one request and wrap its result in a response envelope."""
+        op = request.get('op')
+        if op == 'ping':
+            return {'ok': True, 'result': 'pong'}
+        if op == 'get_price':
+            return {'ok': True, 'result': await self._handle_get_price(request)}
+        if op == 'bulk_update':
+            return {'ok': True, 'result': await self._handle_bulk_update(request)}
+        if op == 'stats':
+            return {'ok': True, 'result': self._stats()}
+        if op == 'shutdown':
+            asyncio.get_running_loop().call_soon(self._server.close)
+            return {'ok': True, 'result': 'shutting down'}
+        return {'ok': False, 'error': f'Unknown op: {op!r}'}
+    
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve newline-delimited JSON requests on one client connection."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self._dispatch(json.loads(line))
+                except Exception as e:
+                    response = {'ok': False, 'error': str(e)}
+                self.requests_served += 1
+                writer.write((json.dumps(response) + '\n').encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            # Client went away, or the service is shutting down
+            pass
+        finally:
+            writer.close()
+    
+    async def serve(self):
+        """Listen until a shutdown request arrives, then close the browser."""
+        # Lookups and bulk syncs share these slots, so together they never exceed concurrency
+        self.scraper.fetch_slots = asyncio.Semaphore(self.concurrency)
+        self._bulk_lock = asyncio.Lock()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        print(f"🚀 Scrape service listening on {self.host}:{self.port} (concurrency {self.concurrency})")
+        try:
+            async with self._server:
+                try:
+                    await self._server.serve_forever()
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            await self.scraper._close_browser()
+            print("👋 Scrape service stopped")
+
+
+class ScrapeServiceClient:
+    """Synchronous client for the scrape service, starting it on demand."""
+    
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, autostart: bool = True):
+        """
+        Initialize client.
+        
+        Args:
+            host: Host the service listens on
+            port: Port the service listens on
+            autostart: Launch the service in the background if it isn't running
+        """
+        self.host = host
+        self.port = port
+        self.autostart = autostart
+    
+    def _request(self, payload: Dict[str, Any], timeout: Optional[float]) -> Any:
+        """Send one request and return its result, raising on service errors."""
+        with socket.create_connection((self.host, self.port), timeout=5) as sock:
+            sock.settimeout(timeout)
+            sock.sendall((json.dumps(payload) + '\n').encode())
+            with sock.makefile('r', encoding='utf-8') as stream:
+                line = stream.readline()
+        if not line:
+            raise ConnectionError("Scrape service closed the connection")
+        response = json.loads(line)
+        if not response.get('ok'):
+            raise RuntimeError(response.get('error', 'Scrape service error'))
+        return response['result']
+    
+    def is_running(self) -> bool:
+        """Check whether the service answers a ping."""
+        try:
+            return self._request({'op': 'ping'}, timeout=5) == 'pong'
+        except (OSError, ValueError, RuntimeError):
+            return False
+    
+    def ensure_running(self, startup_timeout: float = 20.0):
+        """
+        Start the service in the background if needed and wait until it answers.
+        
+        Raises:
+            ConnectionError: If the service isn't running and can't be started
+        """
+        if self.is_running():
+            return
+        if not self.autostart:
+            raise ConnectionError(f"Scrape service is not running on {self.host}:{self.port}")
+        
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), 'serve', '--host', self.host, '--port', str(self.port)],
+            cwd=os.getcwd(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        deadline = time.time() + startup_timeout
+        while time.time() < deadline:
+            time.sleep(0.25)
+            if self.is_running():
+                return
+        raise ConnectionError(f"Scrape service did not start on {self.host}:{self.port}")
+    
+    def get_price_by_sku(self, sku: str, timeout: float = 90.0) -> Optional[Dict[str, Any]]:
+        """
+        Get product price by SKU from the service.
+        
+        Args:
+            sku: Product SKU number
+            timeout: Seconds to wait for the answer
+        
+        Returns:
+            Dictionary with price and product info, or None if failed
+        """
+        self.ensure_running()
+        return self._request({'op': 'get_price', 'sku': sku}, timeout=timeout)
+    
+    def get_price(self, sku: str) -> Optional[float]:
+        """Get just the price for a SKU from the service (None if failed)."""
+        result = self.get_price_by_sku(sku)
+        return result['price_cents'] / 100 if result else None
+    
+    def bulk_update(self, concurrency: int = 4) -> Dict[str, Any]:
+        """
+        Run a bulk sync of the service's storage (the one an autostarted service gets
+        from this process's working directory and PENNY_STORAGE settings).
+        
+        Args:
+            concurrency: Number of product pages to load in parallel
+        
+        Returns:
+            Dictionary with update statistics
+        """
+        self.ensure_running()
+        return self._request({'op': 'bulk_update', 'concurrency': concurrency}, timeout=None)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get service and browser pool counters."""
+        return self._request({'op': 'stats'}, timeout=10)
+    
+    def shutdown(self):
+        """Ask the service to stop (no-op if it isn't running)."""
+        if self.is_running():
+            self._request({'op': 'shutdown'}, timeout=10)
+
+
+def service_enabled() -> bool:
+    """Whether the app and CLI should route scraping through the service (PENNY_SCRAPER_SERVICE=1)."""
+    return os.environ.get("PENNY_SCRAPER_SERVICE", "").lower() in ("1", "true", "yes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Home Depot scrape service")
+    parser.add_argument('command', choices=['serve', 'price', 'sync', 'stats', 'stop'])
+    parser.add_argument('sku', nargs='?', help="SKU for the 'price' command")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--concurrency', type=int, default=4)
+    args = parser.parse_args()
+    
+    if args.command == 'serve':
+        asyncio.run(ScrapeService(args.host, args.port, args.concurrency).serve())
+    else:
+        client = ScrapeServiceClient(args.host, args.port)
+        if args.command == 'price':
+            if not args.sku:
+                parser.error("the 'price' command needs a SKU")
+            print(json.dumps(client.get_price_by_sku(args.sku), indent=2))
+        elif args.command == 'sync':
+            print(json.dumps(client.bulk_update(concurrency=args.concurrency), indent=2))
+        elif args.command == 'stats':
+            print(json.dumps(client.stats(), indent=2))
+        elif args.command == 'stop':
+            client.shutdown()
+            print("✅ Stop requested")
@@ -4,29 +4,604 @@ Fetches product prices from Home Depot using Playwright with stealth mode to avo
 """
 
 import asyncio
+import atexit
+import concurrent.futures
+import gzip
+import json
+import os
 import re
-import pandas as pd
+import threading
+import time
+import urllib.request
+import weakref
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterable, AsyncIterator, Tuple
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright
 from playwright_stealth import Stealth
 
+from storage import Storage, get_storage
+from schema import to_cents, format_cents
+from prediction import with_predictions
+
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Valid price range, in cents
+MIN_PRICE_CENTS = 1
+MAX_PRICE_CENTS = 10_000_000
+
+# Headers for the plain HTTP tier, matching what the browser context sends
+HTTP_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Accept-Encoding': 'gzip',
+}
+
+# How often (in navigations) a reused page's JS heap size is checked
+HEAP_CHECK_INTERVAL = 5
+
+# Resource types that are never needed to read a price off a product page
+DEFAULT_BLOCKED_RESOURCE_TYPES = ['image', 'media', 'font', 'stylesheet']
+
+# Third-party analytics/ads hosts (subdomains are matched too)
+DEFAULT_BLOCKED_HOSTS = [
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googleadservices.com',
+    'googlesyndication.com',
+    'doubleclick.net',
+    'facebook.net',
+    'facebook.com',
+    'bing.com',
+    'pinterest.com',
+    'tiktok.com',
+    'criteo.com',
+    'criteo.net',
+    'adobedtm.com',
+    'omtrdc.net',
+    'demdex.net',
+    'everesttech.net',
+    'quantummetric.com',
+    'hotjar.com',
+    'branch.io',
+]
+
+
+# Strategy 1: visible 'pricing' elements, in order of preference
+PRICING_SELECTORS = [
+    '[data-testid="pricing"]',
+    '[data-automation-id="pricing"]',
+    '.pricing',
+    '[class*="pricing"]',
+    '[id*="pricing"]',
+    'span[data-testid="price"]',
+    '[data-automation-id="product-price"]',
+    '.price__dollars',
+    '[class*="price"]',
+]
+
+# Strategy 2: common Home Depot price elements, visible or not
+PRICE_SELECTORS = [
+    'span[data-testid="price"]',
+    '.price__dollars',
+    '[data-automation-id="product-price"]',
+    'span.price',
+    '[class*="price__"]',
+]
+
+# Strategy 3: price-looking text anywhere in the page markup
+PRICE_PATTERN = r'\$?\s*(\d{1,3}(?:,\d{3})*\.\d{2})'
+
+# Runs every extraction strategy inside the page so a price costs one CDP round-trip.
+# The pricing selectors are polled until one yields a price or wait_ms runs out; the
+# remaining strategies then run once. Price text is validated the same way as
+# HomeDepotScraper._parse_price and returned with the name of the strategy that won.
+_EXTRACT_PRICE_JS = """
+async ({pricingSelectors, priceSelectors, pattern, waitMs, pollMs}) => {
+    const parse = (text) => {
+        const cleaned = (text || '').replace(/[^\\d.]/g, '');
+        if (!/^(\\d+\\.?\\d*|\\.\\d+)$/.test(cleaned)) return null;
+        const price = parseFloat(cleaned);
+        return price >= 0.01 && price <= 100000 ? price : null;
+    };
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0 && getComputedStyle(el).visibility !== 'hidden';
+    };
+    const queryAll = (selector) => {
+        try { return Array.from(document.querySelectorAll(selector)); } catch (e) { return []; }
+    };
+    const fromPricing = () => {
+        for (const selector of pricingSelectors) {
+            for (const el of queryAll(selector)) {
+                if (isVisible(el) && parse(el.innerText) !== null) {
+                    return {text: el.innerText, strategy: 'pricing_selector', selector};
+                }
+            }
+        }
+        return null;
+    };
+    const fromPrice = () => {
+        for (const selector of priceSelectors) {
+            const el = queryAll(selector)[0];
+            if (el && parse(el.innerText) !== null) {
+                return {text: el.innerText, strategy: 'price_selector', selector};
+            }
+        }
+        return null;
+    };
+    const fromContent = () => {
+        const html = document.documentElement ? document.documentElement.outerHTML : '';
+        for (const match of html.matchAll(new RegExp(pattern, 'g'))) {
+            if (parse(match[1]) !== null) {
+                return {text: match[1], strategy: 'page_content_regex', selector: null};
+            }
+        }
+        return null;
+    };
+    
+    const deadline = performance.now() + waitMs;
+    while (true) {
+        const found = fromPricing();
+        if (found) return found;
+        if (performance.now() >= deadline) break;
+        await new Promise((resolve) => setTimeout(resolve, pollMs));
+    }
+    return fromPrice() || fromContent();
+}
+"""
+
+# URL fragments of the XHR/GraphQL calls the product page makes to load its pricing
+PRICING_API_URL_MARKERS = [
+    '/federation-gateway/graphql',
+    'opname=productclientonlyproduct',
+    '/product-information-model/',
+]
+
+# Collects the page's embedded structured data in one round-trip: JSON-LD blocks and
+# any server-rendered app state. Parsing happens in Python (_price_from_structured_data).
+_STRUCTURED_DATA_JS = """
+() => {
+    const ldJson = Array.from(document.querySelectorAll('script[type="application/ld+json"]'))
+        .map((script) => script.textContent);
+    const state = [];
+    for (const key of ['__APOLLO_STATE__', '__PRELOADED_STATE__', '__INITIAL_STATE__']) {
+        if (window[key]) {
+            try { state.push(JSON.stringify(window[key])); } catch (e) {}
+        }
+    }
+    const nextData = document.getElementById('__NEXT_DATA__');
+    if (nextData) state.push(nextData.textContent);
+    return {ldJson, state};
+}
+"""
+
+
+def _coerce_price(value: Any) -> Optional[int]:
+    """Convert a structured-data price (number or numeric string) to integer cents in the valid range."""
+    cents = to_cents(value)
+    if cents is None:
+        return None
+    return cents if MIN_PRICE_CENTS <= cents <= MAX_PRICE_CENTS else None
+
+
+def _as_list(value: Any) -> List[Any]:
+    """Wrap a single JSON value in a list (JSON-LD allows either form)."""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _walk_json(data: Any):
+    """Yield (dict, item_id) for every object nested in parsed JSON, in document order.
+    
+    item_id is the nearest enclosing 'itemId', so pricing objects can be tied to a product.
+    """
+    stack = [(data, None)]
+    while stack:
+        node, item_id = stack.pop()
+        if isinstance(node, dict):
+            if node.get('itemId') is not None:
+                item_id = str(node['itemId'])
+            yield node, item_id
+            children = node.values()
+        elif isinstance(node, list):
+            children = node
+        else:
+            continue
+        stack.extend((child, item_id) for child in reversed(list(children)) if isinstance(child, (dict, list)))
+
+
+def _price_from_json_ld(blob: Any) -> Optional[Dict[str, Any]]:
+    """Read price, was-price and availability from a JSON-LD Product/Offer block."""
+    for obj, _ in _walk_json(blob):
+        if 'Product' not in _as_list(obj.get('@type')):
+            continue
+        for offer in _as_list(obj.get('offers')):
+            if not isinstance(offer, dict):
+                continue
+            price_cents = _coerce_price(offer.get('price', offer.get('lowPrice')))
+            if price_cents is None:
+                continue
+            was_price_cents = None
+            for spec in _as_list(offer.get('priceSpecification')):
+                if isinstance(spec, dict) and any(
+                    kind in str(spec.get('priceType', '')) for kind in ('StrikethroughPrice', 'ListPrice')
+                ):
+                    was_price_cents = _coerce_price(spec.get('price'))
+            availability = offer.get('availability')
+            return {
+                'price_cents': price_cents,
+                'was_price_cents': was_price_cents,
+                # 'https://schema.org/InStock' -> 'InStock'
+                'availability': str(availability).rstrip('/').rsplit('/', 1)[-1] if availability else None,
+                'strategy': 'json_ld'
+            }
+    return None
+
+
+def _price_from_app_state(blob: Any, sku: Optional[str] = None, require_item_id: bool = False) -> Optional[Dict[str, Any]]:
+    """Read price from server-rendered app state ({"pricing": {"value": ..., "original": ...}}).
+    
+    Pricing that belongs to a different itemId (e.g. recommended products) is ignored.
+    With require_item_id, pricing that isn't tied to the SKU's itemId is ignored too.
+    """
+    for obj, item_id in _walk_json(blob):
+        pricing = obj.get('pricing')
+        if not isinstance(pricing, dict):
+            continue
+        if sku and item_id and item_id != str(sku):
+            continue
+        if require_item_id and item_id is None:
+            continue
+        price_cents = _coerce_price(pricing.get('value'))
+        if price_cents is None:
+            continue
+        availability = obj.get('availability')
+        availability_type = obj.get('availabilityType')
+        if availability is None and isinstance(availability_type, dict):
+            availability = 'Discontinued' if availability_type.get('discontinued') else availability_type.get('type')
+        return {
+            'price_cents': price_cents,
+            'was_price_cents': _coerce_price(pricing.get('original')),
+            'availability': availability if isinstance(availability, str) else None,
+            'strategy': 'app_state'
+        }
+    return None
+
+
+def _structured_data_from_html(html: str):
+    """
+    Pull the JSON-LD blocks and server-rendered app state out of raw page HTML.
+    
+    This is the non-browser counterpart of _STRUCTURED_DATA_JS.
+    
+    Returns:
+        Tuple of (JSON-LD texts, app state texts) for _price_from_structured_data
+    """
+    ld_json = re.findall(
+        r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>',
+        html, re.S | re.I
+    )
+    state = re.findall(
+        r'window\.(?:__APOLLO_STATE__|__PRELOADED_STATE__|__INITIAL_STATE__)\s*=\s*(.*?);?\s*</script>',
+        html, re.S
+    )
+    state += re.findall(r'<script[^>]*id=["\']__NEXT_DATA__["\'][^>]*>(.*?)</script>', html, re.S | re.I)
+    return ld_json, state
+
+
+def _http_get(url: str, timeout: float) -> str:
+    """Blocking GET returning the decoded response body (run in an executor)."""
+    request = urllib.request.Request(url, headers=HTTP_HEADERS)
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read()
+        if response.headers.get('Content-Encoding', '').lower() == 'gzip':
+            body = gzip.decompress(body)
+        return body.decode(response.headers.get_content_charset() or 'utf-8', errors='replace')
+
+
+def _is_pricing_api_response(response) -> bool:
+    """Check whether a response looks like one of the product page's own pricing API calls."""
+    try:
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return False
+        if 'json' not in response.headers.get('content-type', ''):
+            return False
+    except Exception:
+        return False
+    url = response.url.lower()
+    return any(marker in url for marker in PRICING_API_URL_MARKERS)
+
+
+def _price_from_structured_data(ld_json: List[str], state: List[str], sku: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Pull price, was-price and availability from a page's embedded structured data.
+    
+    Args:
+        ld_json: Raw text of the page's JSON-LD script blocks
+        state: Raw JSON text of any server-rendered app state
+        sku: Product SKU, used to skip pricing that belongs to other products
+        
+    Returns:
+        Dictionary with 'price_cents', 'was_price_cents', 'availability' and 'strategy', or None
+    """
+    def parse_all(texts):
+        for text in texts:
+            try:
+                yield json.loads(text)
+            except (TypeError, ValueError):
+                continue
+    
+    found = None
+    for blob in parse_all(ld_json):
+        found = _price_from_json_ld(blob)
+        if found:
+            break
+    
+    # App state is the fallback for the price and fills in fields JSON-LD left out
+    if found is None or found['was_price_cents'] is None or found['availability'] is None:
+        for blob in parse_all(state):
+            from_state = _price_from_app_state(blob, sku)
+            if from_state:
+                if found is None:
+                    found = from_state
+                else:
+                    found['was_price_cents'] = found['was_price_cents'] or from_state['was_price_cents']
+                    found['availability'] = found['availability'] or from_state['availability']
+                break
+    
+    return found
+
+
+class BackgroundLoop:
+    """An asyncio event loop running forever in a daemon thread.
+    
+    Lets synchronous callers (Streamlit reruns, plain scripts) drive async scraper code
+    without creating and tearing down an event loop - and with it the Playwright driver
+    and browser - on every call.
+    """
+    
+    def __init__(self, name: str = "scraper-loop"):
+        """
+        Start the loop thread.
+        
+        Args:
+            name: Thread name (shows up in debuggers and thread dumps)
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name=name, daemon=True)
+        self._thread.start()
+    
+    def run(self, coro, timeout: Optional[float] = None):
+        """
+        Run a coroutine on the loop from any other thread and wait for its result.
+        
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait before giving up (the coroutine is cancelled)
+            
+        Returns:
+            The coroutine's result
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+
+# The one loop thread behind every synchronous scraper call in this process, and the
+# Playwright driver that scrapers running on it launch their browsers from
+_shared_loop = None
+_shared_loop_lock = threading.Lock()
+_shared_playwright = None
+_shared_playwright_lock = None
+
+
+async def _get_shared_playwright():
+    """Get the Playwright driver shared by scrapers on the shared loop, starting it if needed."""
+    global _shared_playwright, _shared_playwright_lock
+    # Created in-loop, like the scrapers' browser locks
+    if _shared_playwright_lock is None:
+        _shared_playwright_lock = asyncio.Lock()
+    async with _shared_playwright_lock:
+        if _shared_playwright is None:
+            _shared_playwright = await async_playwright().start()
+    return _shared_playwright
+
+
+def _stop_shared_playwright():
+    """Stop the shared Playwright driver, and with it every browser launched from it."""
+    if _shared_playwright is not None:
+        try:
+            _shared_loop.run(_shared_playwright.stop(), timeout=10)
+        except Exception:
+            pass
+
+
+def _close_abandoned_browser(loop, browser, playwright):
+    """
+    Close the browser of a scraper that was garbage-collected without close().
+    
+    Called by weakref.finalize from whichever thread dropped the scraper, so the close
+    is only scheduled on the browser's loop. playwright is the scraper's own driver,
+    stopped too, or None for the shared one.
+    """
+    if loop.is_closed():
+        # The browser went down with its loop's driver
+        return
+    
+    async def close():
+        try:
+            await browser.close()
+        except Exception:
+            pass
+        if playwright is not None:
+            try:
+                await playwright.stop()
+            except Exception:
+                pass
+    
+    asyncio.run_coroutine_threadsafe(close(), loop)
+
+
+def _weak_handler(method):
+    """Wrap a bound method as a Playwright handler that doesn't keep its scraper alive."""
+    method_ref = weakref.WeakMethod(method)
+    
+    def handler(arg):
+        bound = method_ref()
+        if bound is not None:
+            return bound(arg)
+    
+    return handler
+
+
+def get_shared_loop() -> BackgroundLoop:
+    """Get the process-wide BackgroundLoop used by the synchronous scraper API, starting it if needed."""
+    global _shared_loop
+    with _shared_loop_lock:
+        if _shared_loop is None:
+            _shared_loop = BackgroundLoop(name="penny-scraper-loop")
+            atexit.register(_stop_shared_playwright)
+        return _shared_loop
+
+
+def _run_on_shared_loop(coro, timeout: Optional[float] = None):
+    """Run a coroutine on the shared loop from synchronous code."""
+    loop = get_shared_loop()
+    if threading.current_thread() is loop._thread:
+        coro.close()
+        raise RuntimeError("Synchronous scraper calls can't be made from the scraper's own event loop; await the async methods instead")
+    return loop.run(coro, timeout)
+
 
 class HomeDepotScraper:
     """Scraper for Home Depot product prices using Playwright with stealth mode."""
     
-    def __init__(self):
-        """Initialize scraper."""
+    def __init__(self, block_resources: bool = False,
+                 blocked_resource_types: Optional[List[str]] = None,
+                 blocked_hosts: Optional[List[str]] = None,
+                 capture_api_responses: bool = True,
+                 http_first: bool = True,
+                 http_timeout: float = 10.0,
+                 readiness: str = 'event',
+                 page_timeout: float = 30.0,
+                 sku_timeout: float = 45.0,
+                 max_page_navigations: int = 50,
+                 max_page_heap_mb: float = 256,
+                 max_context_pages: int = 20):
+        """
+        Initialize scraper.
+        
+        Args:
+            block_resources: Intercept requests and abort the ones matching the blocklists
+            blocked_resource_types: Playwright resource types to block
+                (default: DEFAULT_BLOCKED_RESOURCE_TYPES)
+            blocked_hosts: Hosts to block, including their subdomains
+                (default: DEFAULT_BLOCKED_HOSTS)
+            capture_api_responses: Resolve the price from the page's own pricing API
+                response as soon as it arrives, then stop loading the page
+            http_first: Try a plain HTTP fetch of the product page before using the browser
+            http_timeout: Timeout in seconds for the plain HTTP fetch
+            readiness: 'event' navigates to DOMContentLoaded and returns as soon as a
+                price is extractable; 'networkidle' waits for the network to go quiet first
+            page_timeout: Deadline in seconds for loading a product page and finding its price
+            sku_timeout: Hard budget in seconds for a SKU's whole fetch (all tiers). A page
+                still busy when it runs out is closed and replaced.
+            max_page_navigations: Recreate a page after this many navigations (0 = never)
+            max_page_heap_mb: Recreate a page whose JS heap grows past this size (0 = never)
+            max_context_pages: Rotate to a fresh browser context after it has opened this
+                many pages (0 = never)
+        """
+        self.block_resources = block_resources
+        self.capture_api_responses = capture_api_responses
+        self.http_first = http_first
+        self.http_timeout = http_timeout
+        if readiness not in ('event', 'networkidle'):
+            raise ValueError(f"readiness must be 'event' or 'networkidle', not {readiness!r}")
+        self.readiness = readiness
+        self.page_timeout = page_timeout
+        self.sku_timeout = sku_timeout
+        self.max_page_navigations = max_page_navigations
+        self.max_page_heap_mb = max_page_heap_mb
+        self.max_context_pages = max_context_pages
+        # Watchdog counters (SKUs that hit sku_timeout and pages closed because of it)
+        # and recycle policy counters
+        self.fetch_stats = {
+            'timeouts': 0,
+            'pages_replaced': 0,
+            'page_recycles': 0,
+            'context_rotations': 0,
+        }
+        self.blocked_resource_types = set(
+            DEFAULT_BLOCKED_RESOURCE_TYPES if blocked_resource_types is None else blocked_resource_types
+        )
+        self.blocked_hosts = tuple(
+            host.lower().lstrip('.') for host in (DEFAULT_BLOCKED_HOSTS if blocked_hosts is None else blocked_hosts)
+        )
+        # Request interception counters (only collected when block_resources is on).
+        # Blocked requests are aborted before any data is sent, so their size is
+        # unknown; bytes_received is the declared size of the responses we let through.
+        self.route_stats = {
+            'requests_blocked': 0,
+            'requests_allowed': 0,
+            'bytes_received': 0,
+            'blocked_by_type': {},
+        }
         self.browser = None
         self.context = None
         self.page = None
         self.playwright = None
+        # False when self.playwright is the shared driver, which close() leaves running
+        self._owns_playwright = True
+        # Closes the browser if the scraper is dropped without close() (see _watch_browser)
+        self._finalizer = None
+        # Extra pages opened for concurrent fetching, kept open for reuse
+        self._idle_pages = []
+        # Serializes browser launches, context rotation and page opening between
+        # concurrent workers (created in-loop, see _get_browser_lock)
+        self._browser_lock = None
+        # Optional semaphore every pooled fetch acquires, capping SKUs in flight across
+        # all callers sharing this scraper (set by the scrape service)
+        self.fetch_slots: Optional[asyncio.Semaphore] = None
+        # Recycle policy bookkeeping: navigations per open page, pages opened in the
+        # current context, and rotated-out contexts waiting for their pages to finish
+        self._page_navigations = {}
+        self._context_page_count = 0
+        self._retired_contexts = []
+    
+    async def __aenter__(self):
+        """Use as `async with HomeDepotScraper() as scraper:`; the browser launches on first use."""
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        """Close the browser when the block exits."""
+        await self._close_browser()
     
     async def _init_browser(self):
-        """Initialize Playwright browser with stealth mode."""
+        """
+        Initialize Playwright browser with stealth mode.
+        
+        Safe to call repeatedly: an already running browser is reused, so a bulk run
+        pays the launch cost once instead of once per SKU.
+        """
+        # A browser that crashed mid-run can't be reused - drop it and relaunch
+        if self.browser is not None and not self.browser.is_connected():
+            self.browser = None
+            self.context = None
+            self.page = None
+            self._idle_pages = []
+            self._retired_contexts = []
+            self._page_navigations = {}
+        
         if self.browser is None or self.playwright is None:
             if self.playwright is None:
-                self.playwright = await async_playwright().start()
+                self.playwright = await self._start_playwright()
             try:
                 self.browser = await self.playwright.chromium.launch(
                     headless=True,
@@ -40,48 +615,213 @@ class HomeDepotScraper:
                         "Please wait for the automatic installation to complete, or refresh the page."
                     ) from e
                 raise
-            self.context = await self.browser.new_context(
-                viewport={'width': 1920, 'height': 1080},
-                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                ignore_https_errors=True
-            )
-            
-            # Suppress console warnings from the website (not our code)
-            async def handle_console(msg):
-                # Filter out common website warnings that don't affect our scraping
-                text = msg.text.lower()
-                ignored_patterns = [
-                    'content security policy',
-                    'csp',
-                    'eval',
-                    'autocomplete',
-                    'unrecognized feature',
-                    'iframe',
-                    'sandbox'
-                ]
-                
-                # Only log actual errors, ignore warnings and CSP messages
-                if msg.type == 'error' and not any(pattern in text for pattern in ignored_patterns):
-                    print(f"Browser console error: {msg.text}")
-            
-            self.page.on('console', handle_console)
-            
-            # Suppress page errors (like CSP violations)
-            async def handle_page_error(error):
-                # Filter out CSP and other website-side errors
-                error_text = str(error).lower()
-                if 'content security policy' not in error_text and 'csp' not in error_text:
-                    print(f"Page error: {error}")
+            self._watch_browser()
+            self.context = await self._new_context()
+    
+    async def _start_playwright(self):
+        """Playwright driver to launch from: the shared one on the shared loop, otherwise our own."""
+        if _shared_loop is not None and asyncio.get_running_loop() is _shared_loop.loop:
+            self._owns_playwright = False
+            return await _get_shared_playwright()
+        self._owns_playwright = True
+        return await async_playwright().start()
+    
+    def _watch_browser(self):
+        """Close the newly launched browser (and our own driver) if this scraper is dropped without close()."""
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        self._finalizer = weakref.finalize(
+            self, _close_abandoned_browser, asyncio.get_running_loop(), self.browser,
+            self.playwright if self._owns_playwright else None
+        )
+        # At exit, stopping the shared driver closes the shared loop's browsers
+        self._finalizer.atexit = False
+    
+    def _get_browser_lock(self) -> asyncio.Lock:
+        """Lock serializing browser launches, context rotation and page opening (created in-loop)."""
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        return self._browser_lock
+    
+    async def _new_context(self):
+        """Create a browser context with stealth mode and (optionally) resource blocking."""
+        context = await self.browser.new_context(
+            viewport={'width': 1920, 'height': 1080},
+            user_agent=USER_AGENT,
+            ignore_https_errors=True
+        )
+        
+        # Apply stealth mode using the new Stealth class API on context
+        # This ensures all pages created within this context inherit stealth techniques
+        stealth = Stealth()
+        await stealth.apply_stealth_async(context)
+        
+        # Drop heavy assets and trackers - we only need the price text
+        if self.block_resources:
+            await context.route('**/*', _weak_handler(self._route_request))
+            context.on('response', _weak_handler(self._count_response_bytes))
+        
+        self._context_page_count = 0
+        return context
+    
+    async def _rotate_context(self):
+        """
+        Switch new pages to a fresh context.
+        
+        The old context is closed as soon as its last page is, so pages still loading
+        in it (other concurrent workers) aren't interrupted.
+        """
+        old_context = self.context
+        self._context_page_count = 0
+        self.context = await self._new_context()
+        self.fetch_stats['context_rotations'] += 1
+        if old_context.pages:
+            self._retired_contexts.append(old_context)
+        else:
+            await self._close_context(old_context)
+    
+    async def _close_context(self, context):
+        """Close a context, ignoring errors from one that is already gone."""
+        if context in self._retired_contexts:
+            self._retired_contexts.remove(context)
+        try:
+            await context.close()
+        except Exception:
+            pass
+    
+    async def _close_page(self, page):
+        """Close a page, then its context too if that was retired and is now empty."""
+        self._page_navigations.pop(page, None)
+        if page is self.page:
+            self.page = None
+        try:
+            context = page.context
+            await page.close()
+        except Exception:
+            return
+        if context in self._retired_contexts and not context.pages:
+            await self._close_context(context)
+    
+    async def _apply_recycle_policy(self, page):
+        """
+        Count a navigation on a page and close it if the recycle policy says so.
+        
+        A page is recycled after max_page_navigations navigations, when its JS heap
+        exceeds max_page_heap_mb (checked every HEAP_CHECK_INTERVAL navigations), or
+        once its context has been rotated out. Recycled pages are replaced on demand.
+        """
+        if page is None or page.is_closed():
+            return
+        navigations = self._page_navigations.get(page, 0) + 1
+        self._page_navigations[page] = navigations
+        
+        recycle = page.context in self._retired_contexts
+        if not recycle and self.max_page_navigations and navigations >= self.max_page_navigations:
+            recycle = True
+        if not recycle and self.max_page_heap_mb and navigations % HEAP_CHECK_INTERVAL == 0:
+            try:
+                heap_bytes = await page.evaluate(
+                    '() => performance.memory ? performance.memory.usedJSHeapSize : 0'
+                )
+                recycle = heap_bytes > self.max_page_heap_mb * 1024 * 1024
+            except Exception:
+                recycle = True
+        
+        if recycle:
+            self.fetch_stats['page_recycles'] += 1
+            await self._close_page(page)
+    
+    def _is_blocked_request(self, resource_type: str, url: str) -> bool:
+        """Check whether a request matches the resource type or host blocklist."""
+        # Never block the product page itself
+        if resource_type == 'document':
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        host = (urlparse(url).hostname or '').lower()
+        return any(host == blocked or host.endswith('.' + blocked) for blocked in self.blocked_hosts)
+    
+    async def _route_request(self, route):
+        """Route handler that aborts blocklisted requests and lets everything else through."""
+        request = route.request
+        try:
+            if self._is_blocked_request(request.resource_type, request.url):
+                self.route_stats['requests_blocked'] += 1
+                by_type = self.route_stats['blocked_by_type']
+                by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+                await route.abort()
+            else:
+                self.route_stats['requests_allowed'] += 1
+                await route.continue_()
+        except Exception:
+            # The page may have been closed while the request was in flight
+            pass
+    
+    def _count_response_bytes(self, response):
+        """Add a response's declared size to the bandwidth counter."""
+        try:
+            self.route_stats['bytes_received'] += int(response.headers.get('content-length', 0))
+        except (TypeError, ValueError):
+            pass
+    
+    async def _new_page(self):
+        """
+        Open a new page in the shared context with console noise filtering attached.
+        
+        Callers must hold _browser_lock, so no worker opens a page in a context another
+        one is rotating out, and the context's page count stays accurate.
+        """
+        # Rotate the context once it has served its share of pages
+        if self.max_context_pages and self._context_page_count >= self.max_context_pages:
+            await self._rotate_context()
+        self._context_page_count += 1
+        page = await self.context.new_page()
+        
+        # Suppress console warnings from the website (not our code)
+        async def handle_console(msg):
+            # Filter out common website warnings that don't affect our scraping
+            text = msg.text.lower()
+            ignored_patterns = [
+                'content security policy',
+                'csp',
+                'eval',
+                'autocomplete',
+                'unrecognized feature',
+                'iframe',
+                'sandbox'
+            ]
             
-            self.page.on('pageerror', handle_page_error)
-            # Apply stealth mode using the new Stealth class API on context
-            # This ensures all pages created within this context inherit stealth techniques
-            stealth = Stealth()
-            await stealth.apply_stealth_async(self.context)
-            self.page = await self.context.new_page()
+            # Only log actual errors, ignore warnings and CSP messages
+            if msg.type == 'error' and not any(pattern in text for pattern in ignored_patterns):
+                print(f"Browser console error: {msg.text}")
+        
+        page.on('console', handle_console)
+        
+        # Suppress page errors (like CSP violations)
+        async def handle_page_error(error):
+            # Filter out CSP and other website-side errors
+            error_text = str(error).lower()
+            if 'content security policy' not in error_text and 'csp' not in error_text:
+                print(f"Page error: {error}")
+        
+        page.on('pageerror', handle_page_error)
+        return page
     
     async def _close_browser(self):
         """Close browser and cleanup resources."""
+        for page in self._idle_pages:
+            try:
+                await page.close()
+            except Exception:
+                pass
+        self._idle_pages = []
+        self._page_navigations = {}
+        for context in self._retired_contexts:
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._retired_contexts = []
         if self.page:
             try:
                 await self.page.close()
@@ -97,155 +837,238 @@ class HomeDepotScraper:
                 await self.browser.close()
             except Exception:
                 pass
-        if self.playwright:
+        if self.playwright and self._owns_playwright:
             try:
                 await self.playwright.stop()
             except Exception:
                 pass
+        if self._finalizer is not None:
+            self._finalizer.detach()
+            self._finalizer = None
         self.browser = None
         self.context = None
         self.page = None
         self.playwright = None
     
-    def _parse_price(self, price_text: str) -> Optional[float]:
-        """Parse price string to float."""
+    def _parse_price(self, price_text: str) -> Optional[int]:
+        """Parse price string to integer cents."""
         # Remove currency symbols, whitespace, and commas
         price_text = re.sub(r'[^\d.]', '', price_text)
-        try:
-            price = float(price_text)
-            # Validate reasonable price range
-            if 0.01 <= price <= 100000:
-                return price
-        except ValueError:
-            pass
-        return None
+        # Validate reasonable price range
+        return _coerce_price(price_text)
     
-    async def _extract_price_from_page(self) -> Optional[float]:
-        """Extract price from the current page using multiple strategies."""
-        try:
-            # Strategy 1: Wait for and extract from 'pricing' element
-            # Try multiple common selectors for pricing element
-            pricing_selectors = [
-                '[data-testid="pricing"]',
-                '[data-automation-id="pricing"]',
-                '.pricing',
-                '[class*="pricing"]',
-                '[id*="pricing"]',
-                'span[data-testid="price"]',
-                '[data-automation-id="product-price"]',
-                '.price__dollars',
-                '[class*="price"]',
-            ]
-            
-            for selector in pricing_selectors:
-                try:
-                    # Wait for element with timeout
-                    element = await self.page.wait_for_selector(
-                        selector,
-                        timeout=5000,
-                        state='visible'
-                    )
-                    if element:
-                        price_text = await element.inner_text()
-                        price = self._parse_price(price_text)
-                        if price:
-                            return price
-                except Exception:
-                    continue
-            
-            # Strategy 2: Look for price in common Home Depot price selectors
-            price_selectors = [
-                'span[data-testid="price"]',
-                '.price__dollars',
-                '[data-automation-id="product-price"]',
-                'span.price',
-                '[class*="price__"]',
-            ]
-            
-            for selector in price_selectors:
-                try:
-                    element = await self.page.query_selector(selector)
-                    if element:
-                        price_text = await element.inner_text()
-                        price = self._parse_price(price_text)
-                        if price:
-                            return price
-                except Exception:
-                    continue
-            
-            # Strategy 3: Search page content for price patterns
-            page_content = await self.page.content()
-            price_pattern = r'\$?\s*(\d{1,3}(?:,\d{3})*\.\d{2})'
-            matches = re.findall(price_pattern, page_content)
-            if matches:
-                for match in matches:
-                    price = self._parse_price(match)
-                    if price:
-                        return price
+    async def _extract_price_from_page(self, page, wait_ms: int = 5000) -> Optional[Dict[str, Any]]:
+        """
+        Extract price from the given page using multiple strategies.
+        
+        All strategies run inside the page in a single evaluate call (see
+        _EXTRACT_PRICE_JS) instead of one wait/query round-trip per selector.
+        
+        Args:
+            page: Page to extract the price from
+            wait_ms: How long to wait for a visible pricing element before falling
+                back to the other strategies
             
+        Returns:
+            Dictionary with 'price_cents', 'strategy' and 'selector', or None if not found
+        """
+        try:
+            found = await page.evaluate(_EXTRACT_PRICE_JS, {
+                'pricingSelectors': PRICING_SELECTORS,
+                'priceSelectors': PRICE_SELECTORS,
+                'pattern': PRICE_PATTERN,
+                'waitMs': wait_ms,
+                'pollMs': 100,
+            })
+            if found:
+                price_cents = self._parse_price(found['text'])
+                if price_cents:
+                    return {
+                        'price_cents': price_cents,
+                        'strategy': found['strategy'],
+                        'selector': found['selector']
+                    }
         except Exception as e:
             print(f"⚠️  Error extracting price: {e}")
         
         return None
     
-    async def _fetch_from_product_page_async(self, url: str, sku: str) -> Optional[Dict[str, Any]]:
-        """Fetch price from product page using Playwright."""
+    async def _extract_structured_price(self, page, sku: str) -> Optional[Dict[str, Any]]:
+        """Extract price from the page's JSON-LD or embedded app state, or None if absent."""
         try:
-            await self._init_browser()
-            
-            # Navigate to product page
-            await self.page.goto(url, wait_until='networkidle', timeout=30000)
+            data = await page.evaluate(_STRUCTURED_DATA_JS)
+            return _price_from_structured_data(data.get('ldJson', []), data.get('state', []), sku)
+        except Exception as e:
+            print(f"⚠️  Error reading structured data: {e}")
+            return None
+    
+    async def _wait_for_api_price(self, task, api_price) -> bool:
+        """Wait until task finishes or the pricing API response arrives; True if the latter."""
+        try:
+            await asyncio.wait({task} if api_price is None else {task, api_price},
+                               return_when=asyncio.FIRST_COMPLETED)
+        except asyncio.CancelledError:
+            # Out of time - don't leave the page operation running on its own
+            task.cancel()
+            raise
+        if api_price is None or not api_price.done():
+            return False
+        # Got the price - abandon whatever the page was still doing
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        return True
+    
+    async def _fetch_from_product_page_async(self, url: str, sku: str, page=None) -> Optional[Dict[str, Any]]:
+        """
+        Fetch price from product page using Playwright (on the main page unless one is given).
+        
+        The whole fetch shares one deadline of page_timeout seconds. In 'event' readiness
+        mode navigation only waits for DOMContentLoaded, and the price is returned as soon
+        as it is extractable - from the pricing API response, the embedded structured
+        data or the rendered pricing element, whichever comes first.
+        """
+        api_price = None
+        on_response = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.page_timeout
+        
+        def remaining_ms() -> int:
+            return max(0, int((deadline - loop.time()) * 1000))
+        
+        def api_result() -> Dict[str, Any]:
+            found = api_price.result()
+            return {
+                'sku': sku,
+                'price_cents': found['price_cents'],
+                'was_price_cents': found['was_price_cents'],
+                'availability': found['availability'],
+                'url': url,
+                'method': 'api_response',
+                'strategy': 'pricing_api'
+            }
+        
+        try:
+            if page is None:
+                async with self._get_browser_lock():
+                    await self._init_browser()
+                    # Only unpooled fetches use the main page, so it's opened here rather
+                    # than at launch; reopened if the watchdog or recycle policy closed it
+                    if self.page is None or self.page.is_closed():
+                        self.page = await self._new_page()
+                page = self.page
             
-            # Wait for pricing element to load
-            # Try multiple selectors with increasing timeout
-            pricing_found = False
-            pricing_selectors = [
-                '[data-testid="pricing"]',
-                '[data-automation-id="pricing"]',
-                '.pricing',
-                '[class*="pricing"]',
-                '[id*="pricing"]',
-            ]
+            # Listen for the page's own pricing API responses - the price is usually
+            # available from them long before the page finishes rendering
+            if self.capture_api_responses:
+                api_price = loop.create_future()
+                
+                async def on_response(response):
+                    if api_price.done() or not _is_pricing_api_response(response):
+                        return
+                    try:
+                        data = await response.json()
+                    except Exception:
+                        return
+                    found = _price_from_app_state(data, sku, require_item_id=True)
+                    if found and not api_price.done():
+                        api_price.set_result(found)
+                
+                page.on('response', on_response)
             
-            for selector in pricing_selectors:
+            # Navigate to product page
+            wait_until = 'networkidle' if self.readiness == 'networkidle' else 'domcontentloaded'
+            navigation = asyncio.ensure_future(page.goto(url, wait_until=wait_until, timeout=remaining_ms()))
+            if await self._wait_for_api_price(navigation, api_price):
+                # Abort the rest of the page load
                 try:
-                    await self.page.wait_for_selector(
-                        selector,
-                        timeout=10000,
-                        state='visible'
-                    )
-                    pricing_found = True
-                    break
+                    await page.evaluate('window.stop()')
                 except Exception:
-                    continue
+                    pass
+                return api_result()
+            navigation.result()
             
-            # If pricing element not found, wait a bit for page to fully load
-            if not pricing_found:
-                await self.page.wait_for_timeout(2000)
+            # Embedded structured data is server-rendered, so when it carries the price
+            # there is no need to wait for the pricing widgets to hydrate
+            structured = await self._extract_structured_price(page, sku)
+            if structured:
+                return {
+                    'sku': sku,
+                    'price_cents': structured['price_cents'],
+                    'was_price_cents': structured['was_price_cents'],
+                    'availability': structured['availability'],
+                    'url': url,
+                    'method': 'structured_data',
+                    'strategy': structured['strategy']
+                }
             
-            # Extract price
-            price = await self._extract_price_from_page()
+            # Poll for the rendered price until the deadline - returns the moment it appears
+            extraction = asyncio.ensure_future(self._extract_price_from_page(page, wait_ms=remaining_ms()))
+            if await self._wait_for_api_price(extraction, api_price):
+                return api_result()
+            extracted = extraction.result()
             
-            if price:
+            if extracted:
                 return {
                     'sku': sku,
-                    'price': price,
+                    'price_cents': extracted['price_cents'],
+                    'was_price_cents': None,
+                    'availability': None,
                     'url': url,
-                    'method': 'product_page'
+                    'method': 'product_page',
+                    'strategy': extracted['strategy']
                 }
             
         except Exception as e:
             print(f"❌ Error fetching from product page: {e}")
             return None
+        finally:
+            if on_response is not None:
+                page.remove_listener('response', on_response)
         
         return None
     
-    async def _get_price_by_sku_async(self, sku: str) -> Optional[Dict[str, Any]]:
+    async def _fetch_via_http_async(self, sku: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a SKU's price without a browser, from the server-rendered product page.
+        
+        Args:
+            sku: Product SKU number
+            
+        Returns:
+            Dictionary with price and product info, or None if the page couldn't be
+            fetched or had no price in its structured data
+        """
+        product_url = f"https://www.homedepot.com/p/{sku}"
+        
+        try:
+            loop = asyncio.get_running_loop()
+            html = await loop.run_in_executor(None, _http_get, product_url, self.http_timeout)
+        except Exception:
+            # Blocked, timed out or not found - the browser tier will retry
+            return None
+        
+        found = _price_from_structured_data(*_structured_data_from_html(html), sku)
+        if not found:
+            return None
+        return {
+            'sku': sku,
+            'price_cents': found['price_cents'],
+            'was_price_cents': found['was_price_cents'],
+            'availability': found['availability'],
+            'url': product_url,
+            'method': 'http',
+            'strategy': found['strategy'],
+            'tier': 'http'
+        }
+    
+    async def _fetch_via_browser_async(self, sku: str, page=None) -> Optional[Dict[str, Any]]:
         """
-        Async wrapper that handles both fetching and cleanup in the same event loop.
+        Fetch a SKU's price using the current browser session, launching it if needed.
         
         Args:
             sku: Product SKU number
+            page: Page to load the product on (defaults to the scraper's main page)
             
         Returns:
             Dictionary with price and product info, or None if failed
@@ -253,19 +1076,143 @@ class HomeDepotScraper:
         product_url = f"https://www.homedepot.com/p/{sku}"
         
         try:
-            result = await self._fetch_from_product_page_async(product_url, sku)
-            return result
+            result = await self._fetch_from_product_page_async(product_url, sku, page)
+        except asyncio.CancelledError:
+            # Watchdog: the SKU ran out of time, most likely on a hung page. Close the
+            # page so the next SKU gets a fresh one instead of inheriting the stuck load.
+            await self._discard_page(page if page is not None else self.page)
+            raise
         except Exception as e:
             print(f"❌ Error: {e}")
+            result = None
+        
+        await self._apply_recycle_policy(page if page is not None else self.page)
+        if result:
+            result['tier'] = 'browser'
+        return result
+    
+    async def _discard_page(self, page):
+        """Close a page that can't be reused; a fresh one is opened when next needed."""
+        if page is None:
+            return
+        self.fetch_stats['pages_replaced'] += 1
+        await self._close_page(page)
+    
+    async def _with_sku_budget(self, sku: str, fetch) -> Optional[Dict[str, Any]]:
+        """Run a SKU's fetch under the per-SKU deadline; None (and a counted timeout) if it overruns."""
+        try:
+            return await asyncio.wait_for(fetch, timeout=self.sku_timeout)
+        except asyncio.TimeoutError:
+            self.fetch_stats['timeouts'] += 1
+            print(f"⏱️  SKU {sku} hit its {self.sku_timeout:g}s deadline")
             return None
+    
+    async def _fetch_pooled_async(self, sku: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch one SKU on a page borrowed from the idle pool, under the per-SKU deadline.
+        
+        Safe to call concurrently; callers bound how many run at once, and fetch_slots
+        (when set) bounds them across all callers. The plain HTTP tier is tried first,
+        and the browser is only launched once a SKU needs it.
+        
+        Args:
+            sku: Product SKU number
+            
+        Returns:
+            Dictionary with price and product info, or None if failed
+        """
+        async def fetch_in_pool():
+            if self.http_first:
+                result = await self._fetch_via_http_async(sku)
+                if result:
+                    return result
+            
+            try:
+                # Launch, rotation check and page opening happen together, one worker at a time
+                async with self._get_browser_lock():
+                    await self._init_browser()
+                    page = self._idle_pages.pop() if self._idle_pages else await self._new_page()
+            except Exception as e:
+                print(f"❌ Error opening page for SKU {sku}: {e}")
+                return None
+            try:
+                return await self._fetch_via_browser_async(sku, page)
+            finally:
+                # Pages closed by the watchdog are replaced, not returned to the pool
+                if not page.is_closed():
+                    self._idle_pages.append(page)
+        
+        if self.fetch_slots is None:
+            return await self._with_sku_budget(sku, fetch_in_pool())
+        # The per-SKU deadline starts once a slot is free
+        async with self.fetch_slots:
+            return await self._with_sku_budget(sku, fetch_in_pool())
+    
+    async def fetch_many(self, skus: Iterable[str], concurrency: int = 4) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """
+        Fetch prices for many SKUs, yielding each one as soon as it completes.
+        
+        Results arrive out of order, tagged with their SKU. `concurrency` workers pull
+        SKUs from the iterable lazily and the results buffer is bounded, so memory stays
+        constant no matter how many SKUs are streamed through. Each SKU tries the plain
+        HTTP tier first, then a page borrowed from the shared browser's pool.
+        
+        Example:
+            async with HomeDepotScraper() as scraper:
+                async for sku, result in scraper.fetch_many(skus, concurrency=8):
+                    ...
+        
+        Args:
+            skus: Product SKU numbers (any iterable, including a generator)
+            concurrency: Maximum number of SKUs fetched at the same time
+            
+        Yields:
+            (sku, result) tuples; result is None if the fetch failed
+        """
+        worker_count = max(1, int(concurrency))
+        sku_iter = iter(skus)
+        results = asyncio.Queue(maxsize=worker_count)
+        worker_done = object()
+        
+        async def worker():
+            try:
+                for sku in sku_iter:
+                    sku = str(sku).strip()
+                    try:
+                        result = await self._fetch_pooled_async(sku)
+                    except Exception as e:
+                        # Report the SKU as failed and keep the worker for the rest of the run
+                        print(f"❌ Error fetching SKU {sku}: {e}")
+                        result = None
+                    await results.put((sku, result))
+            except Exception as e:
+                # The SKU iterable itself failed
+                print(f"❌ Error in fetch worker: {e}")
+            await results.put(worker_done)
+        
+        workers = [asyncio.ensure_future(worker()) for _ in range(worker_count)]
+        try:
+            running = worker_count
+            while running:
+                item = await results.get()
+                if item is worker_done:
+                    running -= 1
+                else:
+                    yield item
         finally:
-            # Cleanup browser in the same event loop
-            await self._close_browser()
+            # Consumer stopped early (or finished) - don't leave workers behind
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
     
     def get_price_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
         """
         Get product price by SKU using Playwright.
-        Uses a single event loop for both fetching and cleanup.
+        
+        Runs on the process-wide background event loop, so repeated calls reuse the
+        same Playwright driver and browser instead of launching them every time. The
+        browser stays open until close() is called, the scraper is garbage-collected or
+        the interpreter exits. Safe to call from several threads at once.
         
         Args:
             sku: Product SKU number
@@ -273,8 +1220,12 @@ class HomeDepotScraper:
         Returns:
             Dictionary with price and product info, or None if failed
         """
-        # Use a single asyncio.run() call that handles both fetch and cleanup
-        return asyncio.run(self._get_price_by_sku_async(sku))
+        return _run_on_shared_loop(self._fetch_pooled_async(sku), timeout=self.sku_timeout + 15)
+    
+    def close(self):
+        """Close the browser kept warm by the synchronous methods."""
+        if self.playwright is not None:
+            _run_on_shared_loop(self._close_browser(), timeout=30)
     
     def get_price(self, sku: str) -> Optional[float]:
         """
@@ -287,7 +1238,7 @@ class HomeDepotScraper:
             Price as float, or None if failed
         """
         result = self.get_price_by_sku(sku)
-        return result['price'] if result else None
+        return result['price_cents'] / 100 if result else None
 
 
 def get_product_price(sku: str) -> Optional[float]:
@@ -300,24 +1251,125 @@ def get_product_price(sku: str) -> Optional[float]:
     Returns:
         Price as float, or None if failed
     """
-    scraper = HomeDepotScraper()
-    return scraper.get_price(sku)
+    return _get_default_scraper().get_price(sku)
+
+
+_default_scraper = None
+
+
+def _get_default_scraper() -> HomeDepotScraper:
+    """Scraper with default options shared by the module-level convenience functions."""
+    global _default_scraper
+    with _shared_loop_lock:
+        if _default_scraper is None:
+            _default_scraper = HomeDepotScraper()
+        return _default_scraper
+
+
+# Storage locations with a bulk sync in progress in this process (any thread or loop)
+_running_syncs = set()
+_running_syncs_lock = threading.Lock()
+
+
+def _snapshot_route_stats(route_stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a scraper's route_stats, including the nested per-type counts."""
+    return dict(route_stats, blocked_by_type=dict(route_stats['blocked_by_type']))
+
+
+def _route_stats_since(route_stats: Dict[str, Any], before: Dict[str, Any]) -> Dict[str, Any]:
+    """Request interception counters accumulated since the `before` snapshot."""
+    since = {key: value - before.get(key, 0) for key, value in route_stats.items() if key != 'blocked_by_type'}
+    before_by_type = before.get('blocked_by_type', {})
+    since['blocked_by_type'] = {
+        resource_type: count - before_by_type.get(resource_type, 0)
+        for resource_type, count in route_stats['blocked_by_type'].items()
+        if count != before_by_type.get(resource_type, 0)
+    }
+    return since
+
+
+def _sync_journal_path(location: str) -> str:
+    """Run journal kept next to the watchlist file while a bulk sync is in progress."""
+    return f"{location}.sync-journal.json"
+
+
+def _load_sync_journal(journal_path: str, max_age_hours: float) -> Optional[Dict[str, Any]]:
+    """Load an unfinished run's journal, or None if there is none or it is too old to resume."""
+    try:
+        with open(journal_path, 'r', encoding='utf-8') as f:
+            journal = json.load(f)
+        started_at = datetime.strptime(journal['started_at'], "%Y-%m-%d %H:%M:%S")
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        return None
+    if (datetime.now() - started_at).total_seconds() > max_age_hours * 3600:
+        return None
+    return journal
+
+
+def _write_sync_journal(journal_path: str, journal: Dict[str, Any]):
+    """Write the run journal atomically so a crash mid-write can't corrupt it."""
+    tmp_path = journal_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(journal, f)
+    os.replace(tmp_path, journal_path)
 
 
-async def _bulk_update_async(csv_path: str = "tracked_skus.csv", price_history_path: str = "price_history.csv") -> Dict[str, Any]:
+async def _bulk_update_async(csv_path: str = "tracked_skus.csv", price_history_path: str = "price_history.csv",
+                             concurrency: int = 1, scraper: Optional[HomeDepotScraper] = None,
+                             checkpoint_every: int = 50, checkpoint_interval: float = 30.0,
+                             resume: bool = True, resume_max_age_hours: float = 24.0,
+                             storage: Optional[Storage] = None, **scraper_kwargs) -> Dict[str, Any]:
     """
     Async bulk update that processes all SKUs in a single event loop.
     
+    Results are flushed to storage every `checkpoint_every` SKUs or `checkpoint_interval`
+    seconds, whichever comes first, and the SKUs done so far are recorded in a run journal next
+    to the watchlist file. If the run is interrupted, the next call resumes it: SKUs already
+    refreshed in that run are skipped. The journal is removed once the run completes.
+    
+    Only one sync of a given storage runs at a time in this process; a second one
+    returns straight away with success False.
+    
     Args:
         csv_path: Path to the tracked SKUs CSV file
         price_history_path: Path to the price history CSV file
+        concurrency: Number of product pages to load in parallel
+        scraper: Already running scraper to use; its browser is left open afterwards.
+            By default a new scraper is created for the run and closed at the end.
+        checkpoint_every: Flush results after this many SKUs
+        checkpoint_interval: Flush results after this many seconds
+        resume: Resume an interrupted run instead of starting over
+        resume_max_age_hours: Interrupted runs older than this are started over
+        storage: Storage backend to use; defaults to get_storage() on csv_path/price_history_path
+        **scraper_kwargs: Options passed to HomeDepotScraper (e.g. block_resources=True)
         
     Returns:
         Dictionary with update statistics
     """
+    if storage is None:
+        storage = get_storage(csv_path, price_history_path)
+    sync_key = os.path.abspath(storage.location)
+    with _running_syncs_lock:
+        if sync_key in _running_syncs:
+            return {
+                'success': False,
+                'message': f'A sync of {storage.location} is already running',
+                'updated': 0,
+                'failed': 0
+            }
+        _running_syncs.add(sync_key)
+    
     try:
         # Read tracked SKUs
-        df = pd.read_csv(csv_path)
+        try:
+            df = storage.load_watchlist()
+        except FileNotFoundError:
+            return {
+                'success': False,
+                'message': f'Tracked SKUs file not found: {storage.location}',
+                'updated': 0,
+                'failed': 0
+            }
         
         if df.empty:
             return {
@@ -327,75 +1379,126 @@ async def _bulk_update_async(csv_path: str = "tracked_skus.csv", price_history_p
                 'failed': 0
             }
         
-        # Initialize scraper (reuse for efficiency - but each SKU will still create/close browser)
-        scraper = HomeDepotScraper()
+        # Pick up an interrupted run, or start a new one
+        journal_path = _sync_journal_path(storage.location)
+        journal = _load_sync_journal(journal_path, resume_max_age_hours) if resume else None
+        if journal is None:
+            journal = {'started_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'done': []}
+        done_skus = set(journal['done'])
+        resumed_count = len(done_skus)
+        if resumed_count:
+            print(f"↩️ Resuming sync started {journal['started_at']} ({resumed_count} SKUs already done)")
         
         updated_count = 0
         failed_count = 0
+        tier_counts = {'http': 0, 'browser': 0}
         current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Load or create price history
-        try:
-            history_df = pd.read_csv(price_history_path)
-        except FileNotFoundError:
-            history_df = pd.DataFrame(columns=['sku', 'price', 'timestamp'])
-        
-        # Update each SKU using async method directly (avoids multiple event loops)
-        for idx, row in df.iterrows():
-            sku = str(row['sku']).strip()
-            if not sku or sku == 'nan':
+        # Collect the SKUs still to refresh (in watchlist order, each once)
+        skus_to_update = []
+        for sku in dict.fromkeys(str(sku).strip() for sku in df['sku']):
+            if not sku or sku == 'nan' or sku in done_skus:
                 continue
-            
-            try:
-                # Fetch price using async method directly
-                result = await scraper._get_price_by_sku_async(sku)
-                
-                if result and result.get('price'):
-                    price = result['price']
+            skus_to_update.append(sku)
+        
+        # Store of each SKU, recorded with its history (stores can partition history)
+        store_ids = dict(zip((str(sku).strip() for sku in df['sku']), df['store_id']))
+        
+        # Results waiting for the next checkpoint. Only the refreshed SKUs are written, and
+        # new observations are appended to the history; existing history is never read.
+        price_updates = {}
+        new_history_rows = []
+        
+        def checkpoint():
+            """Flush results gathered so far, then record them in the journal."""
+            if new_history_rows:
+                storage.append_history(new_history_rows)
+                new_history_rows.clear()
+            if price_updates:
+                # Predictions are stored with the price, so only refreshed SKUs are predicted
+                storage.update_prices(with_predictions(price_updates))
+                price_updates.clear()
+            journal['done'] = sorted(done_skus)
+            _write_sync_journal(journal_path, journal)
+        
+        # Initialize scraper - one browser session is shared by every SKU in this run
+        owns_scraper = scraper is None
+        if owns_scraper:
+            scraper = HomeDepotScraper(**scraper_kwargs)
+        fetch_stats_before = dict(scraper.fetch_stats)
+        route_stats_before = _snapshot_route_stats(scraper.route_stats)
+        
+        # Fetch prices in parallel pages of one shared browser session, merging each result
+        # as it arrives. The browser is launched once for the run and closed once at the end.
+        since_checkpoint = 0
+        last_checkpoint = time.monotonic()
+        try:
+            async for sku, result in scraper.fetch_many(skus_to_update, concurrency=concurrency):
+                if result and result.get('price_cents'):
+                    price_cents = result['price_cents']
                     
-                    # Update the tracked SKUs dataframe
-                    df.at[idx, 'last_price'] = price
-                    df.at[idx, 'last_updated'] = current_time
+                    # Update the tracked SKU
+                    price_updates[sku] = {'last_price_cents': price_cents, 'last_updated': current_time}
                     
                     # Add to price history
-                    new_history_row = pd.DataFrame({
-                        'sku': [sku],
-                        'price': [price],
-                        'timestamp': [current_time]
+                    new_history_rows.append({
+                        'sku': sku,
+                        'price_cents': price_cents,
+                        'timestamp': current_time,
+                        'store_id': store_ids.get(sku)
                     })
-                    history_df = pd.concat([history_df, new_history_row], ignore_index=True)
                     
+                    done_skus.add(sku)
                     updated_count += 1
-                    print(f"✅ Updated SKU {sku}: ${price:.2f}")
+                    tier = result.get('tier', 'browser')
+                    tier_counts[tier] = tier_counts.get(tier, 0) + 1
+                    print(f"✅ Updated SKU {sku}: {format_cents(price_cents)} (via {tier})")
                 else:
+                    # Not journaled, so a resumed run tries it again
                     failed_count += 1
                     print(f"❌ Failed to fetch price for SKU {sku}")
-                    
-            except Exception as e:
-                failed_count += 1
-                print(f"❌ Error updating SKU {sku}: {e}")
-        
-        # Save updated tracked SKUs
-        df.to_csv(csv_path, index=False)
+                
+                since_checkpoint += 1
+                if since_checkpoint >= checkpoint_every or time.monotonic() - last_checkpoint >= checkpoint_interval:
+                    checkpoint()
+                    since_checkpoint = 0
+                    last_checkpoint = time.monotonic()
+        except BaseException:
+            # Keep whatever finished before the failure so the next run can resume after it
+            checkpoint()
+            raise
+        finally:
+            if owns_scraper:
+                await scraper._close_browser()
         
-        # Save price history
-        history_df.to_csv(price_history_path, index=False)
+        # Final flush; the run is complete so its journal is no longer needed
+        checkpoint()
+        os.remove(journal_path)
         
-        return {
+        # Counters for this run only (a shared scraper accumulates them across runs)
+        run_stats = {key: scraper.fetch_stats[key] - fetch_stats_before.get(key, 0) for key in scraper.fetch_stats}
+        timed_out = run_stats['timeouts']
+        message = f'Updated {updated_count} SKUs, {failed_count} failed'
+        if resumed_count:
+            message += f' (resumed, {resumed_count} already done)'
+        if timed_out:
+            message += f' ({timed_out} hit the {scraper.sku_timeout:g}s per-SKU deadline)'
+        stats = {
             'success': True,
-            'message': f'Updated {updated_count} SKUs, {failed_count} failed',
+            'message': message,
             'updated': updated_count,
             'failed': failed_count,
-            'total': len(df)
+            'resumed': resumed_count,
+            'timed_out': timed_out,
+            'page_recycles': run_stats['page_recycles'],
+            'context_rotations': run_stats['context_rotations'],
+            'total': len(df),
+            'tiers': tier_counts
         }
+        if scraper.block_resources:
+            stats['route_stats'] = _route_stats_since(scraper.route_stats, route_stats_before)
+        return stats
         
-    except FileNotFoundError:
-        return {
-            'success': False,
-            'message': f'Tracked SKUs file not found: {csv_path}',
-            'updated': 0,
-            'failed': 0
-        }
     except Exception as e:
         return {
             'success': False,
@@ -403,22 +1506,41 @@ async def _bulk_update_async(csv_path: str = "tracked_skus.csv", price_history_p
             'updated': 0,
             'failed': 0
         }
+    finally:
+        with _running_syncs_lock:
+            _running_syncs.discard(sync_key)
 
 
-def bulk_update(csv_path: str = "tracked_skus.csv", price_history_path: str = "price_history.csv") -> Dict[str, Any]:
+def bulk_update(csv_path: str = "tracked_skus.csv", price_history_path: str = "price_history.csv",
+                concurrency: int = 1, scraper: Optional[HomeDepotScraper] = None,
+                checkpoint_every: int = 50, checkpoint_interval: float = 30.0, resume: bool = True,
+                storage: Optional[Storage] = None, **scraper_kwargs) -> Dict[str, Any]:
     """
     Bulk update prices for all SKUs in the tracked_skus.csv file.
-    Uses a single event loop for all operations to avoid resource leaks.
+    Runs on the process-wide background event loop, like the other synchronous calls.
     
     Args:
         csv_path: Path to the tracked SKUs CSV file
         price_history_path: Path to the price history CSV file
+        concurrency: Number of product pages to load in parallel (e.g. 8)
+        scraper: Scraper to use; its browser is kept warm afterwards. Defaults to the
+            shared default scraper, or a one-off scraper when scraper_kwargs are given.
+        checkpoint_every: Flush results after this many SKUs
+        checkpoint_interval: Flush results after this many seconds
+        resume: Resume an interrupted run instead of starting over
+        storage: Storage backend to use; defaults to get_storage() on csv_path/price_history_path
+        **scraper_kwargs: Options for a one-off HomeDepotScraper (e.g. block_resources=True)
         
     Returns:
         Dictionary with update statistics
     """
-    # Use a single asyncio.run() call for all SKUs
-    return asyncio.run(_bulk_update_async(csv_path, price_history_path))
+    if scraper is None and not scraper_kwargs:
+        scraper = _get_default_scraper()
+    return _run_on_shared_loop(_bulk_update_async(
+        csv_path, price_history_path, concurrency, scraper=scraper,
+        checkpoint_every=checkpoint_every, checkpoint_interval=checkpoint_interval, resume=resume,
+        storage=storage, **scraper_kwargs
+    ))
 
 
 if __name__ == "__main__":
@@ -434,8 +1556,14 @@ if __name__ == "__main__":
         if result:
             print(f"✅ Success!")
             print(f"   SKU: {result['sku']}")
-            print(f"   Price: ${result['price']:.2f}")
-            print(f"   Method: {result['method']}")
+            print(f"   Price: {format_cents(result['price_cents'])}")
+            if result.get('was_price_cents'):
+                print(f"   Was: {format_cents(result['was_price_cents'])}")
+            if result.get('availability'):
+                print(f"   Availability: {result['availability']}")
+            print(f"   Method: {result['method']} ({result.get('tier', 'browser')} tier)")
+            if result.get('strategy'):
+                print(f"   Strategy: {result['strategy']}")
         else:
             print("❌ Failed to fetch price")
             print("   Check if SKU is valid or if there are network issues")
@@ -0,0 +1,854 @@
+"""
+Penny App Storage
+Persistence for the tracked SKU watchlist and the price history log.
+
+Interchangeable backends are provided:
+    CSVStorage     - tracked_skus.csv and price_history.csv (default)
+    SQLiteStorage  - one SQLite database with indexed, row-level reads and writes
+    ParquetStorage - CSV watchlist, price history as a month-partitioned Parquet dataset
+                     (needs pyarrow)
+Set PENNY_STORAGE=sqlite or PENNY_STORAGE=parquet to switch backends, and run
+`python storage.py import-csv --to <backend>` once to copy existing CSV data over.
+"""
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import threading
+import uuid
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Iterable, Union
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet history is optional
+    pa = ds = pq = None
+
+from schema import (
+    WATCHLIST_COLUMNS, HISTORY_COLUMNS, LEGACY_PRICE_COLUMNS, TIMESTAMP_FORMAT,
+    apply_schema, empty_frame, read_csv, read_csv_chunks, concat_frames, cents_to_text
+)
+
+
+DEFAULT_DB_PATH = "penny.db"
+DEFAULT_HISTORY_DIR = "price_history"
+
+# Bounds accepted by the history time-range filters
+TimeBound = Optional[Union[str, datetime, pd.Timestamp]]
+
+# Hashable token identifying the current state of stored data (see Storage.watchlist_version)
+Version = tuple
+
+
+def _csv_header(path: str) -> List[str]:
+    """Header of an existing CSV file, or [] if it is missing or empty."""
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            return next(csv.reader(f), [])
+    except FileNotFoundError:
+        return []
+
+
+def _append_csv_rows(path: str, rows: List[Dict[str, Any]], default_columns: List[str]):
+    """
+    Append rows to the end of a CSV file without reading or rewriting what is already there.
+    
+    Files that still have a dollar price column instead of a cents column get the price
+    written in dollars, so they stay readable until they are next rewritten.
+    
+    Args:
+        path: CSV file (created with default_columns as its header if missing)
+        rows: Rows to append; their values are placed under the file's existing header
+        default_columns: Header for a new file
+    """
+    columns = _csv_header(path)
+    write_header = not columns
+    if write_header:
+        columns = default_columns
+    new_rows = pd.DataFrame(rows)
+    for legacy, cents_col in LEGACY_PRICE_COLUMNS.items():
+        if legacy in columns and cents_col not in columns and cents_col in new_rows.columns:
+            new_rows[legacy] = new_rows[cents_col].map(cents_to_text)
+    new_rows = new_rows.reindex(columns=columns)
+    
+    with open(path, 'a+b') as f:
+        # Make sure appended rows start on their own line
+        if not write_header:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) not in (b'\n', b'\r'):
+                f.write(b'\n')
+        f.write(new_rows.to_csv(index=False, header=write_header).encode('utf-8'))
+
+
+def _file_version(*paths: str) -> Version:
+    """(path, mtime, size) of each file; None for files that don't exist."""
+    version = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            version.append((path, None))
+            continue
+        version.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def _skus_as_str(values: Iterable[Any]) -> List[str]:
+    """Normalize SKUs to stripped strings (CSV reads may turn them into ints)."""
+    return [str(value).strip() for value in values]
+
+
+def _filter_history(df: pd.DataFrame, sku: Optional[str], start: TimeBound, end: TimeBound) -> pd.DataFrame:
+    """Apply the load_history filters to an in-memory history frame."""
+    if sku is not None:
+        df = df[df['sku'].astype(str) == str(sku).strip()]
+    if start is not None or end is not None:
+        if start is not None:
+            df = df[df['timestamp'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['timestamp'] <= pd.Timestamp(end)]
+    if sku is not None:
+        df = df.sort_values('timestamp', kind='stable')
+    return df
+
+
+def _db_value(value: Any) -> Any:
+    """Value SQLite can store: blanks, NaN and NaT become NULL, timestamps use TIMESTAMP_FORMAT."""
+    if value is None or (isinstance(value, str) and value == '') or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, datetime):
+        return value.strftime(TIMESTAMP_FORMAT)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class PriceHistoryWriter:
+    """Append-only writer for the price history CSV.
+    
+    Rows are buffered in memory and appended to the end of the file on flush(), so the
+    cost of a write depends only on the number of new rows - existing history is never
+    loaded or rewritten.
+    """
+    
+    def __init__(self, path: str = "price_history.csv", flush_every: int = 500):
+        """
+        Initialize writer.
+        
+        Args:
+            path: Path to the price history CSV file (created on first flush)
+            flush_every: Flush automatically once this many rows are buffered
+        """
+        self.path = path
+        self.flush_every = flush_every
+        self.rows_written = 0
+        self._buffer: List[Dict[str, Any]] = []
+    
+    def append(self, row: Dict[str, Any]):
+        """Buffer one history row ({'sku', 'price_cents', 'timestamp'})."""
+        self._buffer.append(row)
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+    
+    def flush(self) -> int:
+        """
+        Append buffered rows to the end of the file.
+        
+        Returns:
+            Number of rows written
+        """
+        if not self._buffer:
+            return 0
+        
+        _append_csv_rows(self.path, self._buffer, HISTORY_COLUMNS)
+        
+        count = len(self._buffer)
+        self.rows_written += count
+        self._buffer.clear()
+        return count
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+
+
+class HistoryTailReader:
+    """Keeps a price history CSV parsed in memory, reading only rows appended since the last read.
+    
+    History is append-mostly, so after the first full parse a refresh costs time in
+    proportion to the new rows. If the file was rewritten instead (replaced, truncated,
+    or changed within the part already read) it is parsed again from the start.
+    """
+    
+    def __init__(self, path: str = "price_history.csv", check_bytes: int = 4096):
+        """
+        Initialize reader.
+        
+        Args:
+            path: Path to the price history CSV file
+            check_bytes: Bytes before the read offset compared on each read to notice rewrites
+        """
+        self.path = path
+        self.check_bytes = check_bytes
+        self._lock = threading.Lock()
+        self._reset()
+    
+    def _reset(self):
+        """Forget everything read so far."""
+        self._frame = None
+        self._inode = None
+        self._header = b''
+        # Bytes parsed so far (always at a line boundary) and the last of them
+        self._offset = 0
+        self._checked = b''
+    
+    def _is_same_file(self, f, stat: os.stat_result) -> bool:
+        """Whether f is the file read before, with its already parsed bytes unchanged."""
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            return False
+        f.seek(self._offset - len(self._checked))
+        return f.read(len(self._checked)) == self._checked
+    
+    def read(self) -> pd.DataFrame:
+        """
+        Bring the parsed history up to date with the file.
+        
+        Returns:
+            The whole history (HISTORY_COLUMNS); shared between calls, so don't modify it
+        """
+        with self._lock:
+            try:
+                f = open(self.path, 'rb')
+            except FileNotFoundError:
+                self._reset()
+                return empty_frame(HISTORY_COLUMNS)
+            
+            with f:
+                stat = os.fstat(f.fileno())
+                if self._frame is None or not self._is_same_file(f, stat):
+                    self._reset()
+                    self._inode = stat.st_ino
+                f.seek(self._offset)
+                data = f.read()
+            
+            # Stop at the last complete line; a row still being written is read next time
+            end = data.rfind(b'\n') + 1
+            if self._frame is None:
+                header_end = data.find(b'\n') + 1
+                if not header_end:
+                    # Empty file, or its header is still being written
+                    return empty_frame(HISTORY_COLUMNS)
+                self._header = data[:header_end]
+                self._frame = read_csv(io.BytesIO(data[:end]))
+            elif end:
+                # The tail has no header of its own, so parse it under the file's header
+                tail = read_csv(io.BytesIO(self._header + data[:end]))
+                self._frame = concat_frames([self._frame, tail])
+            self._offset += end
+            self._checked = (self._checked + data[:end])[-self.check_bytes:]
+            return self._frame
+
+
+class HistoryIndex:
+    """Price history sorted by SKU and time, with each SKU's rows found by one dict lookup.
+    
+    Building the index sorts the history once; after that a SKU's rows are a contiguous
+    slice of the sorted frame, so no lookup scans the history. Meant for backends whose
+    load_history(sku) has to scan (see Storage.reads_history_by_sku).
+    """
+    
+    def __init__(self, history: pd.DataFrame):
+        """
+        Build the index.
+        
+        Args:
+            history: Price history (HISTORY_COLUMNS) with a categorical sku column, as
+                returned by load_history()
+        """
+        codes = history['sku'].cat.codes.to_numpy()
+        # Sort by SKU, then by time within each SKU
+        order = np.lexsort((history['timestamp'].to_numpy(), codes))
+        self.history = history.take(order).reset_index(drop=True)
+        
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]) if len(order) else order
+        stops = np.r_[starts[1:], len(order)]
+        # Position of each SKU's first row in the unsorted history
+        first_rows = np.minimum.reduceat(order, starts) if len(order) else order
+        categories = history['sku'].cat.categories
+        self._slices = {}
+        for _, start, stop in sorted(zip(first_rows, starts, stops)):
+            if sorted_codes[start] >= 0:
+                self._slices[str(categories[sorted_codes[start]]).strip()] = (start, stop)
+        # SKUs with history, in order of first appearance
+        self.skus = list(self._slices)
+    
+    def rows(self, sku: str) -> pd.DataFrame:
+        """One SKU's history, sorted by timestamp (empty if it has none)."""
+        start, stop = self._slices.get(str(sku).strip(), (0, 0))
+        return self.history.iloc[start:stop]
+
+
+class Storage:
+    """Interface shared by the storage backends."""
+    
+    # File the backend keeps its data in (bulk sync journals are written next to it)
+    location = None
+    
+    # Whether load_history(sku) reads only that SKU's rows; if not, it scans the whole
+    # history and callers doing many per-SKU lookups should index it in memory (HistoryIndex)
+    reads_history_by_sku = True
+    
+    def load_watchlist(self) -> pd.DataFrame:
+        """Load every tracked SKU (WATCHLIST_COLUMNS, in insertion order)."""
+        raise NotImplementedError
+    
+    def save_watchlist(self, df: pd.DataFrame):
+        """Replace the whole watchlist with df."""
+        raise NotImplementedError
+    
+    def add_skus(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Add SKUs to the watchlist, skipping ones already tracked.
+        
+        Returns:
+            The rows that were added
+        """
+        raise NotImplementedError
+    
+    def remove_skus(self, skus: Iterable[Any]) -> int:
+        """
+        Stop tracking SKUs.
+        
+        Returns:
+            Number of SKUs removed
+        """
+        raise NotImplementedError
+    
+    def update_prices(self, updates: Dict[str, Dict[str, Any]]):
+        """
+        Set refreshed values for the given SKUs.
+        
+        Args:
+            updates: {sku: {'last_price_cents', 'last_updated', ...}}; any other watchlist
+                columns named in the updates (such as the PREDICTION_COLUMNS) are set too
+        """
+        raise NotImplementedError
+    
+    def watchlist_version(self) -> Version:
+        """
+        Token that changes whenever the watchlist is written, so loads can be cached.
+        
+        Cheap to compute (file metadata only); may change without the data changing, but
+        never the other way round.
+        """
+        raise NotImplementedError
+    
+    def history_version(self) -> Version:
+        """Token that changes whenever price history is written (see watchlist_version)."""
+        raise NotImplementedError
+    
+    def load_history(self, sku: Optional[str] = None, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        """
+        Load price history (HISTORY_COLUMNS).
+        
+        Args:
+            sku: Only this SKU's rows, sorted by timestamp
+            start: Only rows at or after this time
+            end: Only rows at or before this time
+        """
+        raise NotImplementedError
+    
+    def history_skus(self) -> List[str]:
+        """SKUs that have price history, in order of their first observation."""
+        raise NotImplementedError
+    
+    def append_history(self, rows: List[Dict[str, Any]]):
+        """Append price observations ({'sku', 'price_cents', 'timestamp'}, optionally 'store_id') to the history."""
+        raise NotImplementedError
+    
+    def import_csv(self, watchlist_path: str = "tracked_skus.csv", history_path: str = "price_history.csv",
+                   chunksize: int = 100_000) -> Dict[str, int]:
+        """
+        Copy CSV data into this backend (SKUs already in the watchlist are kept as they are).
+        
+        Args:
+            watchlist_path: Path to the tracked SKUs CSV file
+            history_path: Path to the price history CSV file
+            chunksize: History rows read and inserted per batch
+        
+        Returns:
+            Dictionary with the number of watchlist and history rows imported
+        """
+        imported = {'watchlist': 0, 'history': 0}
+        watchlist = CSVStorage(watchlist_path).load_watchlist()
+        if os.path.exists(watchlist_path):
+            imported['watchlist'] = len(self.add_skus(watchlist.to_dict('records')))
+        if os.path.exists(history_path):
+            # Carry each SKU's store over so store-partitioned backends can use it
+            stores = dict(zip(_skus_as_str(watchlist['sku']), watchlist['store_id']))
+            for chunk in read_csv_chunks(history_path, chunksize):
+                rows = chunk.to_dict('records')
+                for row in rows:
+                    row.setdefault('store_id', stores.get(str(row['sku']).strip()))
+                self.append_history(rows)
+                imported['history'] += len(chunk)
+        return imported
+
+
+class CSVStorage(Storage):
+    """Watchlist and price history kept in two CSV files."""
+    
+    reads_history_by_sku = False
+    
+    def __init__(self, watchlist_path: str = "tracked_skus.csv", history_path: str = "price_history.csv"):
+        """
+        Initialize storage.
+        
+        Args:
+            watchlist_path: Path to the tracked SKUs CSV file
+            history_path: Path to the price history CSV file
+        """
+        self.watchlist_path = watchlist_path
+        self.history_path = history_path
+        self.location = watchlist_path
+        # Kept for the life of the storage object, so repeated loads only parse new rows
+        self._history_reader = HistoryTailReader(history_path)
+    
+    def load_watchlist(self) -> pd.DataFrame:
+        if not os.path.exists(self.watchlist_path):
+            return empty_frame(WATCHLIST_COLUMNS)
+        df = read_csv(self.watchlist_path)
+        # Ensure required columns exist
+        for col in WATCHLIST_COLUMNS:
+            if col not in df.columns:
+                df[col] = empty_frame([col])[col].reindex(df.index)
+        return df
+    
+    def save_watchlist(self, df: pd.DataFrame):
+        df.to_csv(self.watchlist_path, index=False, date_format=TIMESTAMP_FORMAT)
+    
+    def add_skus(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        existing_skus = set()
+        if os.path.exists(self.watchlist_path):
+            existing_skus = set(_skus_as_str(read_csv(self.watchlist_path, usecols=['sku'])['sku']))
+        
+        new_rows = []
+        for row in rows:
+            sku = str(row['sku']).strip()
+            if sku not in existing_skus:
+                existing_skus.add(sku)
+                new_rows.append(dict(row, sku=sku))
+        
+        # New SKUs are appended; the rest of the file is left alone
+        if new_rows:
+            _append_csv_rows(self.watchlist_path, new_rows, WATCHLIST_COLUMNS)
+        return new_rows
+    
+    def remove_skus(self, skus: Iterable[Any]) -> int:
+        df = self.load_watchlist()
+        keep = ~pd.Series(_skus_as_str(df['sku']), index=df.index).isin(_skus_as_str(skus))
+        removed = int((~keep).sum())
+        if removed:
+            self.save_watchlist(df[keep])
+        return removed
+    
+    def update_prices(self, updates: Dict[str, Dict[str, Any]]):
+        if not updates:
+            return
+        df = self.load_watchlist()
+        skus = pd.Series(_skus_as_str(df['sku']), index=df.index)
+        mask = skus.isin(updates)
+        updated = apply_schema(pd.DataFrame([updates[sku] for sku in skus[mask]], index=skus[mask].index))
+        for col in WATCHLIST_COLUMNS:
+            if col != 'sku' and col in updated.columns:
+                df.loc[mask, col] = updated[col]
+        self.save_watchlist(df)
+    
+    def watchlist_version(self) -> Version:
+        return _file_version(self.watchlist_path)
+    
+    def history_version(self) -> Version:
+        return _file_version(self.history_path)
+    
+    def load_history(self, sku: Optional[str] = None, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        history = self._history_reader.read()
+        df = _filter_history(history, sku, start, end)
+        # Never hand out the reader's own frame
+        return df.copy() if df is history else df
+    
+    def history_skus(self) -> List[str]:
+        return _skus_as_str(self._history_reader.read()['sku'].drop_duplicates())
+    
+    def append_history(self, rows: List[Dict[str, Any]]):
+        with PriceHistoryWriter(self.history_path, flush_every=len(rows) + 1) as writer:
+            for row in rows:
+                writer.append(row)
+
+
+class SQLiteStorage(Storage):
+    """Watchlist and price history kept in one SQLite database (WAL mode).
+    
+    Writers lock only for the duration of a short transaction and readers never block,
+    so the app, the CLI and the scrape service can share the database.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS watchlist (
+            sku TEXT PRIMARY KEY,
+            store_id TEXT,
+            name TEXT,
+            last_price_cents INTEGER,
+            last_updated TEXT,
+            alert_level TEXT,
+            probability REAL,
+            days_until_drop INTEGER,
+            next_drop_date TEXT,
+            prediction_version INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS price_history (
+            id INTEGER PRIMARY KEY,
+            sku TEXT NOT NULL,
+            price_cents INTEGER NOT NULL,
+            timestamp TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_price_history_sku ON price_history (sku);
+        CREATE INDEX IF NOT EXISTS idx_price_history_sku_timestamp ON price_history (sku, timestamp);
+    """
+    
+    _INSERT_WATCHLIST = (
+        f"INSERT OR IGNORE INTO watchlist ({', '.join(WATCHLIST_COLUMNS)}) "
+        f"VALUES ({', '.join('?' for _ in WATCHLIST_COLUMNS)})"
+    )
+    
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        """
+        Initialize storage, creating the database and its tables if needed.
+        
+        Args:
+            db_path: Path to the SQLite database file
+        """
+        self.db_path = db_path
+        self.location = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(self.SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection; used as a context manager it commits or rolls back one transaction."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
+    def _query(self, sql: str, params: Iterable[Any] = ()) -> pd.DataFrame:
+        """Run a SELECT and return its rows as a typed dataframe."""
+        conn = self._connect()
+        try:
+            return apply_schema(pd.read_sql_query(sql, conn, params=list(params)))
+        finally:
+            conn.close()
+    
+    def _execute(self, sql: str, rows: List[Iterable[Any]]) -> int:
+        """Run one statement for each parameter row in a single transaction."""
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.executemany(sql, rows).rowcount
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _watchlist_rows(rows: Iterable[Dict[str, Any]]) -> List[tuple]:
+        """Parameter tuples for inserting watchlist rows."""
+        return [
+            (str(row['sku']).strip(),) + tuple(_db_value(row.get(col)) for col in WATCHLIST_COLUMNS[1:])
+            for row in rows
+        ]
+    
+    def load_watchlist(self) -> pd.DataFrame:
+        return self._query(f"SELECT {', '.join(WATCHLIST_COLUMNS)} FROM watchlist ORDER BY rowid")
+    
+    def save_watchlist(self, df: pd.DataFrame):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM watchlist")
+                conn.executemany(
+                    self._INSERT_WATCHLIST,
+                    self._watchlist_rows(df.to_dict('records'))
+                )
+        finally:
+            conn.close()
+    
+    def add_skus(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        added = []
+        conn = self._connect()
+        try:
+            with conn:
+                for row, params in zip(rows, self._watchlist_rows(rows)):
+                    if conn.execute(self._INSERT_WATCHLIST, params).rowcount:
+                        added.append(dict(row, sku=params[0]))
+        finally:
+            conn.close()
+        return added
+    
+    def remove_skus(self, skus: Iterable[Any]) -> int:
+        return self._execute("DELETE FROM watchlist WHERE sku = ?", [(sku,) for sku in _skus_as_str(skus)])
+    
+    def update_prices(self, updates: Dict[str, Dict[str, Any]]):
+        if not updates:
+            return
+        columns = [col for col in WATCHLIST_COLUMNS[1:] if any(col in values for values in updates.values())]
+        self._execute(
+            f"UPDATE watchlist SET {', '.join(f'{col} = ?' for col in columns)} WHERE sku = ?",
+            [
+                tuple(_db_value(values.get(col)) for col in columns) + (str(sku),)
+                for sku, values in updates.items()
+            ]
+        )
+    
+    def watchlist_version(self) -> Version:
+        # Committed writes land in the -wal file until a checkpoint moves them into the database
+        return _file_version(self.db_path, self.db_path + "-wal")
+    
+    def history_version(self) -> Version:
+        return self.watchlist_version()
+    
+    def load_history(self, sku: Optional[str] = None, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        conditions, params = [], []
+        if sku is not None:
+            conditions.append("sku = ?")
+            params.append(str(sku).strip())
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            params.append(pd.Timestamp(start).strftime(TIMESTAMP_FORMAT))
+        if end is not None:
+            conditions.append("timestamp <= ?")
+            params.append(pd.Timestamp(end).strftime(TIMESTAMP_FORMAT))
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        order = "timestamp" if sku is not None else "id"
+        return self._query(f"SELECT {', '.join(HISTORY_COLUMNS)} FROM price_history{where} ORDER BY {order}", params)
+    
+    def history_skus(self) -> List[str]:
+        return _skus_as_str(self._query("SELECT sku FROM price_history GROUP BY sku ORDER BY MIN(id)")['sku'])
+    
+    def append_history(self, rows: List[Dict[str, Any]]):
+        self._execute(
+            "INSERT INTO price_history (sku, price_cents, timestamp) VALUES (?, ?, ?)",
+            [(str(row['sku']).strip(), _db_value(row['price_cents']), _db_value(row['timestamp'])) for row in rows]
+        )
+
+
+class ParquetStorage(CSVStorage):
+    """CSV watchlist with price history in a Parquet dataset partitioned by month.
+    
+    History lives under history_dir as month=YYYY-MM/ (and optionally store_id=.../)
+    directories of Parquet files sorted by SKU. Reads only touch the requested columns,
+    skip partitions outside the time range, and use row group statistics to skip
+    other SKUs.
+    """
+    
+    reads_history_by_sku = True
+    
+    def __init__(self, watchlist_path: str = "tracked_skus.csv", history_dir: str = DEFAULT_HISTORY_DIR,
+                 partition_by_store: bool = False):
+        """
+        Initialize storage.
+        
+        Args:
+            watchlist_path: Path to the tracked SKUs CSV file
+            history_dir: Directory holding the Parquet history dataset
+            partition_by_store: Also partition history by store_id
+        """
+        if pa is None:
+            raise ImportError("ParquetStorage needs pyarrow (pip install pyarrow)")
+        super().__init__(watchlist_path, history_path=history_dir)
+        self.history_dir = history_dir
+        self.partition_cols = ['month', 'store_id'] if partition_by_store else ['month']
+        partition_schema = pa.schema([(col, pa.string()) for col in self.partition_cols])
+        self._partitioning = ds.partitioning(partition_schema, flavor='hive')
+        self._file_schema = pa.schema([
+            ('sku', pa.string()),
+            ('price_cents', pa.int32()),
+            ('timestamp', pa.timestamp('s')),
+        ])
+        self._schema = pa.unify_schemas([self._file_schema, partition_schema])
+        # Data files are only ever added or replaced, never changed, so each one's
+        # {sku: first timestamp} is computed once (see history_skus)
+        self._first_seen_by_file = {}
+        self._first_seen_lock = threading.Lock()
+    
+    def history_version(self) -> Version:
+        # Syncs add files (in partition subdirectories) and compaction replaces them
+        files = []
+        for root, _, names in os.walk(self.history_dir):
+            files.extend(os.path.join(root, name) for name in names)
+        return _file_version(*sorted(files))
+    
+    def _dataset(self):
+        """The history dataset, or None before anything has been written."""
+        if not os.path.isdir(self.history_dir):
+            return None
+        return ds.dataset(self.history_dir, format='parquet', schema=self._schema, partitioning=self._partitioning)
+    
+    def load_history(self, sku: Optional[str] = None, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        dataset = self._dataset()
+        if dataset is None:
+            return empty_frame(HISTORY_COLUMNS)
+        
+        # Month bounds prune whole partitions; the rest prune row groups
+        conditions = []
+        if sku is not None:
+            conditions.append(ds.field('sku') == str(sku).strip())
+        if start is not None:
+            start = pd.Timestamp(start)
+            conditions.append(ds.field('month') >= start.strftime('%Y-%m'))
+            conditions.append(ds.field('timestamp') >= pa.scalar(start.to_pydatetime(), pa.timestamp('s')))
+        if end is not None:
+            end = pd.Timestamp(end)
+            conditions.append(ds.field('month') <= end.strftime('%Y-%m'))
+            conditions.append(ds.field('timestamp') <= pa.scalar(end.to_pydatetime(), pa.timestamp('s')))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        
+        df = apply_schema(dataset.to_table(columns=HISTORY_COLUMNS, filter=expression).to_pandas())
+        return df.sort_values('timestamp', kind='stable', ignore_index=True)
+    
+    def history_skus(self) -> List[str]:
+        """
+        SKUs that have price history, ordered by their first timestamp (ties by SKU).
+        
+        Only data files not seen by an earlier call are read, so after a sync this
+        costs time in proportion to the files it added.
+        """
+        dataset = self._dataset()
+        if dataset is None:
+            return []
+        first_seen = {}
+        with self._first_seen_lock:
+            files = set(dataset.files)
+            # Drop files compaction has since replaced
+            for path in set(self._first_seen_by_file) - files:
+                del self._first_seen_by_file[path]
+            for path in sorted(files):
+                if path not in self._first_seen_by_file:
+                    firsts = pq.read_table(path, columns=['sku', 'timestamp']).group_by('sku').aggregate(
+                        [('timestamp', 'min')]
+                    )
+                    self._first_seen_by_file[path] = dict(
+                        zip(firsts['sku'].to_pylist(), firsts['timestamp_min'].to_pylist())
+                    )
+                for sku, timestamp in self._first_seen_by_file[path].items():
+                    if sku not in first_seen or timestamp < first_seen[sku]:
+                        first_seen[sku] = timestamp
+        return sorted(first_seen, key=lambda sku: (first_seen[sku], sku))
+    
+    def _history_table(self, rows: List[Dict[str, Any]]):
+        """Arrow table of history rows with their partition columns, sorted by SKU and time."""
+        df = pd.DataFrame(rows)
+        df['sku'] = df['sku'].astype(str).str.strip()
+        df['price_cents'] = pd.to_numeric(df['price_cents']).astype('int32')
+        df['timestamp'] = pd.to_datetime(df['timestamp'], format=TIMESTAMP_FORMAT).astype('datetime64[s]')
+        df['month'] = df['timestamp'].dt.strftime('%Y-%m')
+        columns = HISTORY_COLUMNS + ['month']
+        if 'store_id' in self.partition_cols:
+            store_ids = df['store_id'] if 'store_id' in df.columns else pd.Series('', index=df.index)
+            df['store_id'] = store_ids.fillna('').astype(str).replace('', 'unknown')
+            columns.append('store_id')
+        df = df[columns].sort_values(['sku', 'timestamp'], kind='stable')
+        return pa.Table.from_pandas(df, preserve_index=False)
+    
+    def append_history(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        # Every append adds new files; nothing already written is touched
+        pq.write_to_dataset(
+            self._history_table(rows),
+            self.history_dir,
+            partition_cols=self.partition_cols,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet"
+        )
+    
+    def compact(self, row_group_size: int = 64_000) -> int:
+        """
+        Merge each partition's files into one file sorted by SKU and time.
+        
+        Syncs add a small file per checkpoint; compacting keeps reads down to one file
+        per partition with small, SKU-clustered row groups.
+        
+        Returns:
+            Number of partitions compacted
+        """
+        compacted = 0
+        for directory, _, files in os.walk(self.history_dir):
+            paths = [os.path.join(directory, f) for f in sorted(files) if f.endswith('.parquet')]
+            if len(paths) < 2:
+                continue
+            table = ds.dataset(paths, format='parquet', schema=self._file_schema).to_table()
+            table = table.sort_by([('sku', 'ascending'), ('timestamp', 'ascending')])
+            tmp_path = os.path.join(directory, f"compacted-{uuid.uuid4().hex}.parquet.tmp")
+            pq.write_table(table, tmp_path, row_group_size=row_group_size)
+            os.replace(tmp_path, tmp_path[:-len('.tmp')])
+            for path in paths:
+                os.remove(path)
+            compacted += 1
+        return compacted
+
+
+def get_storage(watchlist_path: str = "tracked_skus.csv", history_path: str = "price_history.csv") -> Storage:
+    """
+    Storage backend selected by PENNY_STORAGE ('csv', 'sqlite' or 'parquet').
+    
+    Args:
+        watchlist_path: Tracked SKUs CSV file (CSV backend)
+        history_path: Price history CSV file (CSV backend)
+    
+    Returns:
+        CSVStorage, SQLiteStorage on the database at PENNY_DB_PATH, or ParquetStorage
+        with history under PENNY_HISTORY_DIR (partitioned by store when PENNY_PARTITION_BY_STORE=1)
+    """
+    backend = os.environ.get("PENNY_STORAGE", "csv").lower()
+    if backend == 'csv':
+        return CSVStorage(watchlist_path, history_path)
+    if backend == 'sqlite':
+        return SQLiteStorage(os.environ.get("PENNY_DB_PATH", DEFAULT_DB_PATH))
+    if backend == 'parquet':
+        return ParquetStorage(
+            watchlist_path,
+            os.environ.get("PENNY_HISTORY_DIR", DEFAULT_HISTORY_DIR),
+            partition_by_store=os.environ.get("PENNY_PARTITION_BY_STORE", "").lower() in ("1", "true", "yes")
+        )
+    raise ValueError(f"Unknown PENNY_STORAGE backend: {backend!r} (expected 'csv', 'sqlite' or 'parquet')")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Penny app storage tools")
+    parser.add_argument('command', choices=['import-csv', 'compact-history'])
+    parser.add_argument('--to', choices=['sqlite', 'parquet'], default='sqlite', help="Backend to import into")
+    parser.add_argument('--db', default=os.environ.get("PENNY_DB_PATH", DEFAULT_DB_PATH))
+    parser.add_argument('--history-dir', default=os.environ.get("PENNY_HISTORY_DIR", DEFAULT_HISTORY_DIR))
+    parser.add_argument('--by-store', action='store_true', help="Partition Parquet history by store_id")
+    parser.add_argument('--watchlist', default="tracked_skus.csv")
+    parser.add_argument('--history', default="price_history.csv")
+    args = parser.parse_args()
+    
+    if args.command == 'import-csv':
+        if args.to == 'sqlite':
+            target, location = SQLiteStorage(args.db), args.db
+        else:
+            # The Parquet backend keeps the CSV watchlist, so only history is copied
+            target, location = ParquetStorage(args.watchlist, args.history_dir, args.by_store), args.history_dir
+        imported = target.import_csv(args.watchlist, args.history)
+        print(f"✅ Imported {imported['watchlist']} SKUs and {imported['history']} history rows into {location}")
+    elif args.command == 'compact-history':
+        compacted = ParquetStorage(args.watchlist, args.history_dir, args.by_store).compact()
+        print(f"✅ Compacted {compacted} history partitions in {args.history_dir}")
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+import pandas as pd
+
+from prediction import PREDICTION_VERSION, UNKNOWN_ALERT_LEVEL, predict_drop, predict_drops
+
+
+def test_predict_drops_matches_predict_drop_for_every_ending():
+    today = datetime(2026, 10, 18, 12, 30, 0)
+    prices = [100 + ending for ending in range(100)] + [None]
+    
+    predicted = predict_drops(pd.Series(prices, dtype=object), today)
+    
+    for price_cents, row in zip(prices[:-1], predicted.itertuples()):
+        expected = predict_drop(price_cents, today)
+        assert row.alert_level == expected['alert_level'], price_cents
+        assert row.probability == expected['probability'], price_cents
+        if expected['days_until_drop'] is None:
+            assert pd.isna(row.days_until_drop) and pd.isna(row.next_drop_date), price_cents
+        else:
+            assert row.days_until_drop == expected['days_until_drop'], price_cents
+            assert row.next_drop_date == pd.Timestamp(expected['next_drop_date']), price_cents
+    
+    missing = predicted.iloc[-1]
+    assert missing['alert_level'] == UNKNOWN_ALERT_LEVEL
+    assert missing['probability'] == 0.0
+    assert pd.isna(missing['days_until_drop']) and pd.isna(missing['next_drop_date'])
+    assert (predicted['prediction_version'] == PREDICTION_VERSION).all()
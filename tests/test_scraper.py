@@ -0,0 +1,219 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from scraper import (
+    HomeDepotScraper, _bulk_update_async, _is_pricing_api_response, _price_from_app_state, _price_from_structured_data,
+    _structured_data_from_html, _sync_journal_path
+)
+from storage import CSVStorage
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+SKU = '315108234'
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+
+def chromium_installed():
+    """Whether Playwright can launch Chromium here (browser and its system libraries installed)."""
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as playwright:
+            playwright.chromium.launch(headless=True).close()
+        return True
+    except Exception:
+        return False
+
+
+def fake_response(url, resource_type='fetch', content_type='application/json; charset=utf-8'):
+    """Stand-in for a Playwright Response with just the fields the classifier reads."""
+    return SimpleNamespace(
+        url=url,
+        headers={'content-type': content_type},
+        request=SimpleNamespace(resource_type=resource_type)
+    )
+
+
+def test_pricing_api_response_is_recognized():
+    url = 'https://www.homedepot.com/federation-gateway/graphql?opname=productClientOnlyProduct'
+    assert _is_pricing_api_response(fake_response(url))
+    assert _is_pricing_api_response(fake_response(url, resource_type='xhr'))
+
+
+def test_other_responses_are_ignored():
+    url = 'https://www.homedepot.com/federation-gateway/graphql?opname=productClientOnlyProduct'
+    assert not _is_pricing_api_response(fake_response(url, resource_type='document'))
+    assert not _is_pricing_api_response(fake_response(url, content_type='text/html'))
+    assert not _is_pricing_api_response(fake_response('https://www.homedepot.com/api/recs/v1/items'))
+    assert not _is_pricing_api_response(SimpleNamespace(url=url))
+
+
+def test_price_from_captured_api_payload():
+    payload = json.loads(load_fixture('pricing_api_response.json'))
+    
+    found = _price_from_app_state(payload, SKU, require_item_id=True)
+    
+    assert found == {
+        'price_cents': 5903,
+        'was_price_cents': 9900,
+        'availability': 'Shared',
+        'strategy': 'app_state'
+    }
+
+
+def test_api_payload_for_another_product_is_ignored():
+    payload = json.loads(load_fixture('pricing_api_response.json'))
+    payload['data']['recommendations'] = []
+    
+    assert _price_from_app_state(payload, '100000000', require_item_id=True) is None
+
+
+def test_pricing_without_item_id_needs_require_item_id_off():
+    blob = {'pricing': {'value': 12.34}}
+    
+    assert _price_from_app_state(blob, SKU, require_item_id=True) is None
+    assert _price_from_app_state(blob, SKU)['price_cents'] == 1234
+
+
+def test_price_from_html_app_state():
+    ld_json, state = _structured_data_from_html(load_fixture('product_page.html'))
+    
+    assert ld_json == []
+    assert len(state) == 1
+    # The recommended product's pricing comes first in the blob but belongs to another itemId
+    assert _price_from_structured_data(ld_json, state, SKU) == {
+        'price_cents': 6,
+        'was_price_cents': 9900,
+        'availability': 'Discontinued',
+        'strategy': 'app_state'
+    }
+
+
+class Interrupted(Exception):
+    pass
+
+
+class StubScraper:
+    """Stand-in for HomeDepotScraper.fetch_many that can stop partway through a run."""
+    
+    block_resources = False
+    sku_timeout = 45.0
+    
+    def __init__(self, prices, interrupt_after=None):
+        self.prices = prices
+        self.interrupt_after = interrupt_after
+        self.fetched = []
+        self.fetch_stats = {'timeouts': 0, 'pages_replaced': 0, 'page_recycles': 0, 'context_rotations': 0}
+        self.route_stats = {'requests_blocked': 0, 'requests_allowed': 0, 'bytes_received': 0, 'blocked_by_type': {}}
+    
+    async def fetch_many(self, skus, concurrency=4):
+        for sku in skus:
+            if len(self.fetched) == self.interrupt_after:
+                raise Interrupted()
+            self.fetched.append(sku)
+            price_cents = self.prices.get(sku)
+            yield sku, {'price_cents': price_cents, 'tier': 'http'} if price_cents else None
+
+
+def test_interrupted_sync_resumes_after_finished_skus(tmp_path):
+    watchlist = tmp_path / "tracked_skus.csv"
+    watchlist.write_text(
+        "sku,store_id,name,last_price_cents,last_updated\n"
+        "100,,a,,\n200,,b,,\n300,,c,,\n400,,d,,\n"
+    )
+    storage = CSVStorage(str(watchlist), str(tmp_path / "price_history.csv"))
+    journal_path = _sync_journal_path(storage.location)
+    prices = {'100': 1903, '300': 3, '400': 6}
+    
+    # 200 has no price, then the run stops before 300
+    first = StubScraper(prices, interrupt_after=2)
+    result = asyncio.run(_bulk_update_async(storage=storage, scraper=first, checkpoint_every=50))
+    assert not result['success']
+    assert first.fetched == ['100', '200']
+    with open(journal_path) as f:
+        assert json.load(f)['done'] == ['100']
+    assert storage.load_history()['sku'].astype(str).tolist() == ['100']
+    
+    second = StubScraper(prices)
+    result = asyncio.run(_bulk_update_async(storage=storage, scraper=second))
+    assert result['success']
+    assert second.fetched == ['200', '300', '400']
+    assert (result['updated'], result['failed'], result['resumed']) == (2, 1, 1)
+    assert not os.path.exists(journal_path)
+    
+    df = storage.load_watchlist().set_index('sku')
+    assert df['last_price_cents'].fillna(0).tolist() == [1903, 0, 3, 6]
+    assert storage.load_history()['sku'].astype(str).tolist() == ['100', '300', '400']
+
+
+# Product page that requests its pricing API, then blocks DOMContentLoaded on a script
+# that takes far longer than the scraper should wait
+PRODUCT_PAGE = b"""<!DOCTYPE html>
+<html><body>
+<script>fetch('/federation-gateway/graphql?opname=productClientOnlyProduct', {method: 'POST'});</script>
+<script src="/slow.js"></script>
+</body></html>"""
+SLOW_SCRIPT_SECONDS = 20
+
+
+@pytest.fixture
+def product_server():
+    """Local server for PRODUCT_PAGE, answering its pricing API call with the captured payload."""
+    payload = load_fixture('pricing_api_response.json').encode('utf-8')
+    release = threading.Event()
+    
+    class Handler(BaseHTTPRequestHandler):
+        def send(self, body, content_type):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def do_GET(self):
+            if self.path == '/slow.js':
+                release.wait(SLOW_SCRIPT_SECONDS)
+                self.send(b'', 'application/javascript')
+            else:
+                self.send(PRODUCT_PAGE, 'text/html')
+        
+        def do_POST(self):
+            self.send(payload, 'application/json')
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.skipif(not chromium_installed(), reason="Playwright Chromium is not installed")
+def test_price_from_pricing_api_response_stops_page_load(product_server):
+    async def fetch():
+        async with HomeDepotScraper(http_first=False, page_timeout=SLOW_SCRIPT_SECONDS * 2) as scraper:
+            started = time.monotonic()
+            result = await scraper._fetch_from_product_page_async(f"{product_server}/p/{SKU}", SKU)
+            return result, time.monotonic() - started
+    
+    result, elapsed = asyncio.run(fetch())
+    
+    assert result['method'] == 'api_response'
+    assert (result['price_cents'], result['was_price_cents'], result['availability']) == (5903, 9900, 'Shared')
+    # Returned on the API response, without waiting for the page to finish loading
+    assert elapsed < SLOW_SCRIPT_SECONDS / 2
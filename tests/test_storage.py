@@ -0,0 +1,194 @@
+import os
+
+import pandas as pd
+import pytest
+
+from schema import TIMESTAMP_DTYPE
+from storage import CSVStorage, HistoryTailReader, ParquetStorage, SQLiteStorage
+
+
+def test_update_prices_with_unset_timestamps(tmp_path):
+    watchlist = tmp_path / "tracked_skus.csv"
+    watchlist.write_text(
+        "sku,store_id,name,last_price_cents,last_updated\n"
+        "100,0121,a,1903,2026-10-01 00:00:00\n"
+        "200,,b,,\n"
+    )
+    storage = CSVStorage(str(watchlist), str(tmp_path / "price_history.csv"))
+    
+    df = storage.load_watchlist()
+    assert df['last_updated'].dtype == TIMESTAMP_DTYPE
+    assert df['next_drop_date'].dtype == TIMESTAMP_DTYPE
+    
+    storage.update_prices({
+        '200': {'last_price_cents': 3, 'last_updated': '2026-10-18 12:00:00', 'next_drop_date': '2026-11-01 12:00:00'}
+    })
+    
+    df = storage.load_watchlist().set_index('sku')
+    assert df.loc['200', 'last_price_cents'] == 3
+    assert df.loc['200', 'last_updated'] == pd.Timestamp('2026-10-18 12:00:00')
+    assert df.loc['200', 'next_drop_date'] == pd.Timestamp('2026-11-01 12:00:00')
+    assert df.loc['100', 'last_updated'] == pd.Timestamp('2026-10-01 00:00:00')
+    assert df.loc['100', 'store_id'] == '0121'
+
+
+HISTORY_HEADER = "sku,price_cents,timestamp\n"
+
+
+def history_rows(reader):
+    return [tuple(row) for row in reader.read().astype({'sku': str}).itertuples(index=False)]
+
+
+def test_history_tail_reader_reads_appended_rows(tmp_path):
+    path = tmp_path / "price_history.csv"
+    path.write_text(HISTORY_HEADER + "100,1903,2026-10-01 00:00:00\n")
+    reader = HistoryTailReader(str(path))
+    assert history_rows(reader) == [('100', 1903, pd.Timestamp('2026-10-01'))]
+    
+    with open(path, 'a') as f:
+        f.write("200,3,2026-10-02 00:00:00\n")
+    assert history_rows(reader) == [
+        ('100', 1903, pd.Timestamp('2026-10-01')),
+        ('200', 3, pd.Timestamp('2026-10-02'))
+    ]
+    assert reader.read()['price_cents'].dtype == 'Int32'
+
+
+def test_history_tail_reader_holds_back_partial_line(tmp_path):
+    path = tmp_path / "price_history.csv"
+    path.write_text(HISTORY_HEADER + "100,1903,2026-10-01 00:00:00\n200,3,2026-10")
+    reader = HistoryTailReader(str(path))
+    assert history_rows(reader) == [('100', 1903, pd.Timestamp('2026-10-01'))]
+    
+    with open(path, 'a') as f:
+        f.write("-02 00:00:00\n")
+    assert history_rows(reader)[-1] == ('200', 3, pd.Timestamp('2026-10-02'))
+    assert len(reader.read()) == 2
+
+
+def test_history_tail_reader_notices_replaced_file(tmp_path):
+    path = tmp_path / "price_history.csv"
+    path.write_text(HISTORY_HEADER + "100,1903,2026-10-01 00:00:00\n")
+    reader = HistoryTailReader(str(path), check_bytes=8)
+    reader.read()
+    
+    # An atomic rewrite that only changed bytes outside the compared window
+    replacement = tmp_path / "price_history.csv.tmp"
+    replacement.write_text(HISTORY_HEADER + "100,1906,2026-10-01 00:00:00\n300,6,2026-10-03 00:00:00\n")
+    os.replace(replacement, path)
+    assert history_rows(reader) == [
+        ('100', 1906, pd.Timestamp('2026-10-01')),
+        ('300', 6, pd.Timestamp('2026-10-03'))
+    ]
+
+
+def test_history_tail_reader_notices_truncation(tmp_path):
+    path = tmp_path / "price_history.csv"
+    path.write_text(HISTORY_HEADER + "100,1903,2026-10-01 00:00:00\n200,3,2026-10-02 00:00:00\n")
+    reader = HistoryTailReader(str(path))
+    assert len(reader.read()) == 2
+    
+    path.write_text(HISTORY_HEADER + "200,2,2026-10-04 00:00:00\n")
+    assert history_rows(reader) == [('200', 2, pd.Timestamp('2026-10-04'))]
+
+
+def test_history_tail_reader_notices_edited_rows(tmp_path):
+    path = tmp_path / "price_history.csv"
+    path.write_text(HISTORY_HEADER + "100,1903,2026-10-01 00:00:00\n")
+    reader = HistoryTailReader(str(path))
+    reader.read()
+    
+    # Rewritten in place: same inode and size, one byte changed before the read offset
+    with open(path, 'r+') as f:
+        f.seek(len(HISTORY_HEADER) + len("100,190"))
+        f.write("6")
+        f.seek(0, os.SEEK_END)
+        f.write("200,3,2026-10-02 00:00:00\n")
+    assert history_rows(reader) == [
+        ('100', 1906, pd.Timestamp('2026-10-01')),
+        ('200', 3, pd.Timestamp('2026-10-02'))
+    ]
+
+
+def test_sqlite_add_skus_skips_tracked_skus(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "penny.db"))
+    
+    added = storage.add_skus([{'sku': ' 100 ', 'name': 'a'}, {'sku': '200', 'name': 'b'}])
+    assert [row['sku'] for row in added] == ['100', '200']
+    added = storage.add_skus([{'sku': '100', 'name': 'renamed'}, {'sku': '300', 'name': 'c'}, {'sku': '300', 'name': 'c'}])
+    assert [row['sku'] for row in added] == ['300']
+    
+    df = storage.load_watchlist()
+    assert df['sku'].astype(str).tolist() == ['100', '200', '300']
+    assert df['name'].tolist() == ['a', 'b', 'c']
+
+
+def test_sqlite_update_prices(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "penny.db"))
+    storage.add_skus([{'sku': '100', 'name': 'a', 'store_id': '0121'}, {'sku': '200', 'name': 'b'}])
+    
+    storage.update_prices({'200': {'last_price_cents': 3, 'last_updated': '2026-10-18 12:00:00', 'alert_level': 'high'}})
+    
+    df = storage.load_watchlist().set_index('sku')
+    assert df.loc['200', 'last_price_cents'] == 3
+    assert df.loc['200', 'last_updated'] == pd.Timestamp('2026-10-18 12:00:00')
+    assert df.loc['200', 'alert_level'] == 'high'
+    assert pd.isna(df.loc['100', 'last_price_cents'])
+    assert df.loc['100', 'store_id'] == '0121'
+    assert df['last_updated'].dtype == TIMESTAMP_DTYPE
+
+
+def test_sqlite_load_history_orders_by_time(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "penny.db"))
+    storage.append_history([
+        {'sku': '200', 'price_cents': 6, 'timestamp': '2026-10-03 00:00:00'},
+        {'sku': '100', 'price_cents': 1903, 'timestamp': '2026-10-02 00:00:00'},
+        {'sku': '200', 'price_cents': 106, 'timestamp': '2026-10-01 00:00:00'},
+        {'sku': '200', 'price_cents': 3, 'timestamp': '2026-10-05 00:00:00'},
+    ])
+    
+    history = storage.load_history('200')
+    assert history['price_cents'].tolist() == [106, 6, 3]
+    assert history['timestamp'].is_monotonic_increasing
+    assert storage.load_history('200', start='2026-10-02', end='2026-10-04')['price_cents'].tolist() == [6]
+    assert storage.history_skus() == ['200', '100']
+
+
+def test_sqlite_import_csv_converts_dollar_files(tmp_path):
+    watchlist = tmp_path / "tracked_skus.csv"
+    watchlist.write_text("sku,store_id,name,last_price,last_updated\n100,0121,a,19.03,2026-10-01 00:00:00\n200,,b,,\n")
+    history = tmp_path / "price_history.csv"
+    history.write_text("sku,price,timestamp\n100,19.03,2026-10-01 00:00:00\n100,0.03,2026-10-02 00:00:00\n")
+    storage = SQLiteStorage(str(tmp_path / "penny.db"))
+    storage.add_skus([{'sku': '200', 'name': 'kept'}])
+    
+    assert storage.import_csv(str(watchlist), str(history)) == {'watchlist': 1, 'history': 2}
+    
+    df = storage.load_watchlist().set_index('sku')
+    assert df.loc['100', 'last_price_cents'] == 1903
+    assert df.loc['100', 'store_id'] == '0121'
+    assert df.loc['200', 'name'] == 'kept'
+    assert storage.load_history('100')['price_cents'].tolist() == [1903, 3]
+
+
+def test_history_skus_order_matches_across_backends(tmp_path):
+    pytest.importorskip('pyarrow')
+    rows = [
+        {'sku': '300', 'price_cents': 6, 'timestamp': '2026-09-30 00:00:00'},
+        {'sku': '100', 'price_cents': 1903, 'timestamp': '2026-10-02 00:00:00'},
+        {'sku': '200', 'price_cents': 106, 'timestamp': '2026-10-03 00:00:00'},
+        {'sku': '100', 'price_cents': 3, 'timestamp': '2026-10-04 00:00:00'},
+    ]
+    csv_storage = CSVStorage(str(tmp_path / "tracked_skus.csv"), str(tmp_path / "price_history.csv"))
+    sqlite_storage = SQLiteStorage(str(tmp_path / "penny.db"))
+    parquet_storage = ParquetStorage(str(tmp_path / "tracked_skus.csv"), str(tmp_path / "price_history"))
+    for storage in (csv_storage, sqlite_storage, parquet_storage):
+        # One append per row, like checkpoints of successive syncs
+        for row in rows:
+            storage.append_history([row])
+        assert storage.history_skus() == ['300', '100', '200'], storage
+    
+    # Still right once compaction has replaced the files already summarized
+    parquet_storage.append_history([{'sku': '050', 'price_cents': 2, 'timestamp': '2026-10-05 00:00:00'}])
+    assert parquet_storage.compact() == 1
+    assert parquet_storage.history_skus() == ['300', '100', '200', '050']